@@ -1,16 +1,64 @@
 import sys
 import os
 import sqlite3
-from datetime import datetime, timedelta, timezone
+import multiprocessing
+import shutil
+import time
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QVBoxLayout, QFrame,
     QMessageBox, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
-    QComboBox, QSpinBox, QDateEdit, QFileDialog, QCheckBox
+    QComboBox, QSpinBox, QDateEdit, QFileDialog, QCheckBox, QTableView, QListWidget,
+    QProgressDialog
 )
 from PyQt5.QtGui import QFont, QPixmap, QPalette, QBrush, QIcon
-from PyQt5.QtCore import Qt, QTimer, QTime, QSize, QDateTime, QDate
+from PyQt5.QtCore import (
+    Qt, QTimer, QTime, QSize, QDateTime, QDate, QAbstractTableModel, QModelIndex,
+    QThread, pyqtSignal
+)
 import csv
 from PyQt5.QtGui import QIcon
+from db import (
+    SCHEMA_VERSION, create_time_tbl, database_path, ensure_schema, fetch_daily_attendance,
+    fetch_monthly_attendance, fetch_student, fetch_student_history, format_date,
+    format_time, get_persistent_db_path, has_legacy_time_tbl, insert_time_in, latest_time_in_id,
+    month_bounds, now_ts, ph_now, student_visit_totals
+)
+from result_cache import ResultCache
+from attendance_matrix import AttendanceMatrixStore
+from backup import (
+    backup_database, check_attendance_database, check_integrity, default_backup_dir,
+    restore_database
+)
+from event_bus import EventBus, EventStreamServer
+from federated import FEDERATED_CHUNK, FEDERATED_HEADERS, federated_report, format_row, report_bounds
+from maintenance import MaintenanceScheduler, clear_exports, daily_export_path
+
+# Longest the kiosk waits on close for background work to finish
+WORKER_SHUTDOWN_TIMEOUT = 30 * 1000  # ms
+
+# Running QThreads are kept here rather than parented to the window that
+# started them: admin windows are replaced and garbage-collected freely,
+# and Qt aborts the whole kiosk if a thread is destroyed while running
+running_workers = set()
+
+
+def start_worker(worker):
+    """Start a parentless QThread and keep it alive until it has finished"""
+    # Drop finished workers here, on the UI thread, rather than from the
+    # worker's own finished signal
+    running_workers.difference_update([w for w in running_workers if w.isFinished()])
+    running_workers.add(worker)
+    worker.start()
+
+
+def wait_for_workers(timeout):
+    """Wait up to timeout ms in total for running workers; False if some are still busy"""
+    deadline = time.monotonic() + timeout / 1000
+    for worker in list(running_workers):
+        remaining = max(0, int((deadline - time.monotonic()) * 1000))
+        if not worker.wait(remaining):
+            return False
+    return True
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -29,22 +77,6 @@ def resource_path(relative_path):
     
     return path
 
-def get_persistent_db_path():
-    """Get a persistent database path that works across platforms"""
-    if sys.platform == "win32":
-        # On Windows, use AppData/Local
-        base_path = os.getenv('LOCALAPPDATA')
-        app_path = os.path.join(base_path, "AttendanceSystem")
-    else:
-        # On Linux/Mac, use home directory
-        base_path = os.path.expanduser("~")
-        app_path = os.path.join(base_path, ".attendance_system")
-    
-    # Create directory if it doesn't exist
-    os.makedirs(app_path, exist_ok=True)
-    
-    return os.path.join(app_path, "attendance.db")
-
 def load_pixmap(image_path):
     """Safely load a pixmap with error handling"""
     path = resource_path(image_path)
@@ -70,11 +102,157 @@ def load_icon(icon_path, size=None):
         icon.actualSize(QSize(size, size))
     return icon
 
+# (header, formatter) pairs applied to raw query rows at display time
+DAILY_COLUMNS = [
+    ("SR Code", lambda row: str(row[0])),
+    ("Full Name", lambda row: str(row[1])),
+    ("College", lambda row: str(row[2])),
+    ("Program", lambda row: str(row[3])),
+    ("Time-In (AM/PM)", lambda row: format_time(row[4])),
+]
+
+REPORT_COLUMNS = [
+    ("SR Code", lambda row: str(row[0])),
+    ("Full Name", lambda row: str(row[1])),
+    ("Days Attended", lambda row: str(row[2])),
+    ("Attendance Rate", lambda row: f"{row[3]:.1%}"),
+    ("Current Streak", lambda row: str(row[4])),
+    ("Longest Streak", lambda row: str(row[5])),
+]
+
+FEDERATED_COLUMNS = [
+    ("Date", lambda row: format_date(row[0])),
+    ("Time-In (AM/PM)", lambda row: format_time(row[0])),
+    ("Campus", lambda row: str(row[1])),
+    ("SR Code", lambda row: str(row[2])),
+    ("Full Name", lambda row: str(row[3])),
+    ("College", lambda row: str(row[4])),
+    ("Program", lambda row: str(row[5])),
+]
+
+MONTHLY_COLUMNS = [
+    ("Date", lambda row: format_date(row[0])),
+    ("SR Code", lambda row: str(row[1])),
+    ("Full Name", lambda row: str(row[2])),
+    ("College", lambda row: str(row[3])),
+    ("Program", lambda row: str(row[4])),
+    ("Time-In (AM/PM)", lambda row: format_time(row[0])),
+]
+
+class BackupWorker(QThread):
+    """Runs an online backup off the UI thread so scans are never held up"""
+    succeeded = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+
+    def run(self):
+        try:
+            self.succeeded.emit(backup_database(self.db_path))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class FederatedReportWorker(QThread):
+    """Queries the campus databases in worker processes off the UI thread"""
+    rows_ready = pyqtSignal(list)
+    succeeded = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_paths, start, end, parent=None):
+        super().__init__(parent)
+        self.db_paths = db_paths
+        self.start_ts = start
+        self.end_ts = end
+
+    def run(self):
+        try:
+            # Hand the merged rows over in batches as they stream in
+            batch = []
+            for row in federated_report(self.db_paths, self.start_ts, self.end_ts):
+                batch.append(row)
+                if len(batch) >= FEDERATED_CHUNK:
+                    self.rows_ready.emit(batch)
+                    batch = []
+            if batch:
+                self.rows_ready.emit(batch)
+            self.succeeded.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class AttendanceReportWorker(QThread):
+    """Builds or updates the attendance matrix off the UI thread"""
+    succeeded = pyqtSignal(int, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, matrix_store, first_day, last_day, absentees_only, parent=None):
+        super().__init__(parent)
+        self.matrix_store = matrix_store
+        self.first_day = first_day
+        self.last_day = last_day
+        self.absentees_only = absentees_only
+
+    def run(self):
+        try:
+            self.succeeded.emit(*self.matrix_store.report(self.first_day, self.last_day, self.absentees_only))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class AttendanceTableModel(QAbstractTableModel):
+    """Holds raw query rows and formats cells only when the view asks for them"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = []
+        self.rows = []
+
+    def set_rows(self, columns, rows):
+        if rows is self.rows and columns is self.columns:
+            # Same cached result already on screen; keep scroll and selection
+            return
+        self.beginResetModel()
+        self.columns = columns
+        self.rows = rows
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """Add rows at the end, e.g. while a streamed report arrives"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.columns[index.column()][1](self.rows[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
+
+    def formatted_rows(self):
+        """Yield every row formatted for export"""
+        for row in self.rows:
+            yield [fmt(row) for _, fmt in self.columns]
+
 class AdminWindow(QWidget):
     def __init__(self, db_conn):
         super().__init__()
         self.conn = db_conn
         self.cursor = self.conn.cursor()
+        self.result_cache = ResultCache()
+        # The matrix is built on first use and kept up to date incrementally
+        self.matrix_store = AttendanceMatrixStore(database_path(self.conn))
         self.setWindowIcon(load_icon("Batangas_State_Logo.png"))
         self.setWindowTitle("Admin Dashboard - Attendance Logs")
         self.setGeometry(100, 100, 1000, 600)
@@ -106,8 +284,56 @@ class AdminWindow(QWidget):
         self.auto_refresh_check = QCheckBox("Auto-refresh (10 sec)")
         self.auto_refresh_check.stateChanged.connect(self.toggle_auto_refresh)
         refresh_layout.addWidget(self.auto_refresh_check)
+
+        # Backup controls
+        self.backup_btn = QPushButton("Backup Now")
+        self.restore_btn = QPushButton("Restore Backup")
+        for btn in [self.backup_btn, self.restore_btn]:
+            btn.setFixedWidth(130)
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #6c757d;
+                    color: white;
+                    padding: 8px;
+                    font-weight: bold;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #5a6268;
+                }
+            """)
+        self.backup_btn.clicked.connect(self.backup_now)
+        self.restore_btn.clicked.connect(self.restore_backup)
+        refresh_layout.addWidget(self.backup_btn)
+        refresh_layout.addWidget(self.restore_btn)
         
         refresh_layout.addStretch()
+
+        # Student history lookup
+        refresh_layout.addWidget(QLabel("Student History:"))
+        self.history_input = QLineEdit()
+        self.history_input.setPlaceholderText("SR Code")
+        self.history_input.setFixedWidth(150)
+        self.history_input.returnPressed.connect(self.open_student_history)
+        refresh_layout.addWidget(self.history_input)
+
+        self.history_btn = QPushButton("View History")
+        self.history_btn.setFixedWidth(120)
+        self.history_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #17a2b8;
+                color: white;
+                padding: 8px;
+                font-weight: bold;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #138496;
+            }
+        """)
+        self.history_btn.clicked.connect(self.open_student_history)
+        refresh_layout.addWidget(self.history_btn)
+
         self.layout.addLayout(refresh_layout)
 
         self.title = QLabel("Attendance Logs")
@@ -116,7 +342,12 @@ class AdminWindow(QWidget):
         self.layout.addWidget(self.title)
 
         # Table setup
-        self.table = QTableWidget()
+        self.table = QTableView()
+        self.table_model = AttendanceTableModel(self)
+        self.table.setModel(self.table_model)
+        # Size columns from the visible rows only instead of formatting every row
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
+        self.table.doubleClicked.connect(self.open_history_for_row)
         self.layout.addWidget(self.table)
 
         # Filter controls layout
@@ -171,6 +402,8 @@ class AdminWindow(QWidget):
         self.import_students_btn = QPushButton("Import Students CSV")
         self.download_attendance_btn = QPushButton("Export Daily CSV")
         self.download_template_btn = QPushButton("Download Template")
+        self.report_btn = QPushButton("Attendance Report")
+        self.federated_btn = QPushButton("Multi-Campus Report")
 
         # Style and size
         self.import_students_btn.setStyleSheet("""
@@ -202,15 +435,34 @@ class AdminWindow(QWidget):
                 }
             """)
 
+        for btn in [self.report_btn, self.federated_btn]:
+            btn.setFixedWidth(200)
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #6f42c1;
+                    color: white;
+                    padding: 10px;
+                    font-weight: bold;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #59339d;
+                }
+            """)
+
         # Connect buttons to functions
         self.import_students_btn.clicked.connect(self.import_students)
         self.download_attendance_btn.clicked.connect(self.download_csv)
         self.download_template_btn.clicked.connect(self.download_template)
+        self.report_btn.clicked.connect(self.open_attendance_report)
+        self.federated_btn.clicked.connect(self.open_federated_report)
 
         # Add to layout
         buttons_layout.addWidget(self.import_students_btn)
         buttons_layout.addWidget(self.download_attendance_btn)
         buttons_layout.addWidget(self.download_template_btn)
+        buttons_layout.addWidget(self.report_btn)
+        buttons_layout.addWidget(self.federated_btn)
         self.layout.addLayout(buttons_layout)
 
         # Setup auto-refresh timer
@@ -230,6 +482,32 @@ class AdminWindow(QWidget):
             year = self.year_spin.value()
             self.load_monthly_attendance(month, year)
 
+    def open_student_history(self):
+        """Open the history window for the SR code typed in the lookup box"""
+        sr_code = self.history_input.text().strip()
+        if not sr_code:
+            QMessageBox.warning(self, "Input Error", "Please enter an SR CODE.")
+            return
+        self.show_student_history(sr_code)
+
+    def open_history_for_row(self, index):
+        """Open the history window for the student in a double-clicked row"""
+        if not hasattr(self, "records") or index.row() >= len(self.records):
+            return
+        # Daily rows start with the SR code, monthly rows with the timestamp
+        sr_index = 0 if self.table_model.columns is DAILY_COLUMNS else 1
+        self.show_student_history(str(self.records[index.row()][sr_index]))
+
+    def show_student_history(self, sr_code):
+        try:
+            if fetch_student(self.cursor, sr_code) is None:
+                QMessageBox.warning(self, "Not Found", "SR CODE not found in the records.")
+                return
+            self.history_window = StudentHistoryWindow(self.conn, sr_code)
+            self.history_window.show()
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to load student history:\n{e}")
+
     def toggle_auto_refresh(self, state):
         """Toggle auto-refresh timer based on checkbox state"""
         if state == Qt.Checked:
@@ -237,40 +515,29 @@ class AdminWindow(QWidget):
         else:
             self.refresh_timer.stop()
 
+    def cached_query(self, key, closed, fetch):
+        """Return cached rows for key, running fetch() only when needed.
+
+        Closed periods can no longer change, so their results are kept as is.
+        Anything else is revalidated against the latest time_tbl id.
+        """
+        version = None if closed else latest_time_in_id(self.cursor)
+        rows = self.result_cache.get(key, version)
+        if rows is None:
+            rows = fetch()
+            self.result_cache.put(key, rows, version)
+        return rows
+
     def load_daily_attendance(self):
         """Load attendance data for the selected date"""
-        selected_date = self.date_filter.date().toString("yyyy-MM-dd")
+        selected_date = self.date_filter.date().toPyDate()
         try:
-            query = """
-                SELECT 
-                    t.sr_code,
-                    n.full_name,
-                    n.College,
-                    n.PROGRAM,
-                    strftime('%I:%M:%S %p', t.time_in) AS time_in_12hr
-                FROM 
-                    time_tbl t
-                JOIN 
-                    name_tbl n ON t.sr_code = n.sr_code
-                WHERE 
-                    date(t.date_in) = ?
-                ORDER BY 
-                    t.time_in DESC;
-            """
-            
-            self.cursor.execute(query, (selected_date,))
-            self.records = self.cursor.fetchall()
-
-            self.table.setRowCount(len(self.records))
-            self.table.setColumnCount(5)
-            self.table.setHorizontalHeaderLabels([
-                "SR Code", "Full Name", "College", "Program", "Time-In (AM/PM)"  # Updated header
-            ])
-
-            for row_idx, row_data in enumerate(self.records):
-                for col_idx, col_data in enumerate(row_data):
-                    self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
-
+            closed = selected_date < ph_now().date()
+            self.records = self.cached_query(
+                ("daily", selected_date), closed,
+                lambda: fetch_daily_attendance(self.cursor, selected_date)
+            )
+            self.table_model.set_rows(DAILY_COLUMNS, self.records)
             self.table.resizeColumnsToContents()
 
         except Exception as e:
@@ -279,40 +546,13 @@ class AdminWindow(QWidget):
     def load_monthly_attendance(self, month, year):
         """Load attendance data for a specific month and year"""
         try:
-            query = """
-                SELECT 
-                    date(date_in) AS date,
-                    t.sr_code,
-                    n.full_name,
-                    n.College,
-                    n.PROGRAM,
-                    strftime('%I:%M:%S %p', time_in) AS time_in_12hr
-                FROM 
-                    time_tbl t
-                JOIN 
-                    name_tbl n ON t.sr_code = n.sr_code
-                WHERE 
-                    strftime('%m', date_in) = ? AND
-                    strftime('%Y', date_in) = ?
-                ORDER BY 
-                    t.date_in DESC;
-            """
-            month_str = f"{month:02d}"
-            year_str = str(year)
-            
-            self.cursor.execute(query, (month_str, year_str))
-            self.records = self.cursor.fetchall()
-
-            self.table.setRowCount(len(self.records))
-            self.table.setColumnCount(6)
-            self.table.setHorizontalHeaderLabels([
-                "Date", "SR Code", "Full Name", "College", "Program", "Time-In (AM/PM)"  # Updated header
-            ])
-
-            for row_idx, row_data in enumerate(self.records):
-                for col_idx, col_data in enumerate(row_data):
-                    self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
-
+            _, month_end = month_bounds(year, month)
+            closed = month_end <= now_ts()
+            self.records = self.cached_query(
+                ("monthly", year, month), closed,
+                lambda: fetch_monthly_attendance(self.cursor, year, month)
+            )
+            self.table_model.set_rows(MONTHLY_COLUMNS, self.records)
             self.table.resizeColumnsToContents()
 
         except Exception as e:
@@ -346,7 +586,7 @@ class AdminWindow(QWidget):
             with open(path, mode='w', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
                 writer.writerow(["Date", "SR Code", "Full Name", "College", "Program", "Time-In"])
-                writer.writerows(self.records)
+                writer.writerows(self.table_model.formatted_rows())
 
             QMessageBox.information(
                 self, 
@@ -385,6 +625,9 @@ class AdminWindow(QWidget):
                     data
                 )
                 self.conn.commit()
+                # Cached rows and pre-generated exports carry the old names and programs
+                self.result_cache.clear()
+                clear_exports(database_path(self.conn))
                 
                 QMessageBox.information(
                     self, 
@@ -420,10 +663,17 @@ class AdminWindow(QWidget):
             return
 
         try:
-            with open(path, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(["SR Code", "Full Name", "College", "Program", "Time-In"])
-                writer.writerows(self.records)
+            # The kiosk pre-generates the previous day's CSV while idle
+            prepared = daily_export_path(
+                database_path(self.conn), self.date_filter.date().toPyDate()
+            )
+            if os.path.exists(prepared):
+                shutil.copyfile(prepared, path)
+            else:
+                with open(path, mode='w', newline='', encoding='utf-8') as file:
+                    writer = csv.writer(file)
+                    writer.writerow(["SR Code", "Full Name", "College", "Program", "Time-In"])
+                    writer.writerows(self.table_model.formatted_rows())
 
             QMessageBox.information(
                 self, 
@@ -459,6 +709,527 @@ class AdminWindow(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Export Error", f"Failed to save template:\n{e}")
 
+    def backup_now(self):
+        """Take a backup in the background while the kiosk keeps running"""
+        self.backup_btn.setEnabled(False)
+        self.backup_worker = BackupWorker(database_path(self.conn))
+        self.backup_worker.succeeded.connect(self.backup_finished)
+        self.backup_worker.failed.connect(self.backup_failed)
+        start_worker(self.backup_worker)
+
+    def backup_finished(self, path):
+        self.backup_btn.setEnabled(True)
+        QMessageBox.information(self, "Backup Successful", f"Database backed up to:\n{path}")
+
+    def backup_failed(self, error):
+        self.backup_btn.setEnabled(True)
+        QMessageBox.critical(self, "Backup Error", f"Failed to back up database:\n{error}")
+
+    def restore_backup(self):
+        """Replace the current data with a verified backup"""
+        db_path = database_path(self.conn)
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Choose Backup to Restore",
+            default_backup_dir(db_path),
+            "Database Files (*.db)"
+        )
+
+        if not path:
+            return
+
+        try:
+            check_integrity(path)
+            check_attendance_database(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Restore Error", f"Cannot restore this file:\n{e}")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Confirm Restore",
+            "All attendance and student records will be replaced with the selected backup.\n"
+            "A backup of the current data is taken first. Continue?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        try:
+            safety_path = backup_database(db_path, label="pre_restore")
+            restore_database(path, self.conn)
+        except Exception as e:
+            QMessageBox.critical(self, "Restore Error", f"Failed to restore backup:\n{e}")
+            return
+
+        # Nothing computed from the old data is valid any more
+        self.result_cache.clear()
+        clear_exports(db_path)
+        self.matrix_store.reset()
+        self.refresh_data()
+        QMessageBox.information(
+            self,
+            "Restore Successful",
+            f"Backup restored. The previous data was saved to:\n{safety_path}"
+        )
+
+    def open_attendance_report(self):
+        self.report_window = AttendanceReportWindow(self.matrix_store)
+        self.report_window.show()
+
+    def open_federated_report(self):
+        self.federated_window = FederatedReportWindow(database_path(self.conn))
+        self.federated_window.show()
+
+class FederatedReportWindow(QWidget):
+    def __init__(self, local_db_path):
+        super().__init__()
+        self.worker = None
+        self.campuses = set()
+        self.setWindowIcon(load_icon("Batangas_State_Logo.png"))
+        self.setWindowTitle("Multi-Campus Report")
+        self.setGeometry(150, 150, 1000, 650)
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.title = QLabel("Multi-Campus Report")
+        self.title.setFont(QFont("Arial", 18, QFont.Bold))
+        self.title.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.title)
+
+        # Campus database files
+        files_layout = QHBoxLayout()
+        self.file_list = QListWidget()
+        self.file_list.setFixedHeight(90)
+        if local_db_path:
+            self.file_list.addItem(local_db_path)
+        files_layout.addWidget(self.file_list)
+
+        file_buttons = QVBoxLayout()
+        self.add_files_btn = QPushButton("Add Campus DBs")
+        self.clear_files_btn = QPushButton("Clear")
+        self.add_files_btn.clicked.connect(self.add_files)
+        self.clear_files_btn.clicked.connect(self.file_list.clear)
+        file_buttons.addWidget(self.add_files_btn)
+        file_buttons.addWidget(self.clear_files_btn)
+        files_layout.addLayout(file_buttons)
+        self.layout.addLayout(files_layout)
+
+        # Report controls
+        controls_layout = QHBoxLayout()
+        today = QDate.currentDate()
+
+        controls_layout.addWidget(QLabel("View:"))
+        self.view_combo = QComboBox()
+        self.view_combo.addItems(["Daily", "Monthly", "Range"])
+        controls_layout.addWidget(self.view_combo)
+
+        controls_layout.addWidget(QLabel("From:"))
+        self.from_date = QDateEdit()
+        self.from_date.setCalendarPopup(True)
+        self.from_date.setDisplayFormat("yyyy-MM-dd")
+        self.from_date.setDate(today)
+        controls_layout.addWidget(self.from_date)
+
+        controls_layout.addWidget(QLabel("To:"))
+        self.to_date = QDateEdit()
+        self.to_date.setCalendarPopup(True)
+        self.to_date.setDisplayFormat("yyyy-MM-dd")
+        self.to_date.setDate(today)
+        controls_layout.addWidget(self.to_date)
+
+        self.run_btn = QPushButton("Run Report")
+        self.export_btn = QPushButton("Export CSV")
+        for btn in [self.run_btn, self.export_btn]:
+            btn.setFixedWidth(120)
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #007bff;
+                    color: white;
+                    padding: 8px;
+                    font-weight: bold;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #0056b3;
+                }
+            """)
+        self.run_btn.clicked.connect(self.run_report)
+        self.export_btn.clicked.connect(self.export_report)
+        controls_layout.addStretch()
+        controls_layout.addWidget(self.run_btn)
+        controls_layout.addWidget(self.export_btn)
+        self.layout.addLayout(controls_layout)
+
+        self.summary_label = QLabel()
+        self.summary_label.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.summary_label)
+
+        self.table = QTableView()
+        self.table_model = AttendanceTableModel(self)
+        self.table.setModel(self.table_model)
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
+        self.layout.addWidget(self.table)
+
+    def add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Choose Campus Databases",
+            "",
+            "Database Files (*.db)"
+        )
+        existing = {self.file_list.item(i).text() for i in range(self.file_list.count())}
+        for path in paths:
+            if path not in existing:
+                self.file_list.addItem(path)
+
+    def run_report(self):
+        """Query all listed campus databases in parallel"""
+        db_paths = [self.file_list.item(i).text() for i in range(self.file_list.count())]
+        if not db_paths:
+            QMessageBox.warning(self, "No Databases", "Add at least one campus database.")
+            return
+
+        view = self.view_combo.currentText().lower()
+        first_day = self.from_date.date().toPyDate()
+        last_day = self.to_date.date().toPyDate()
+        if view == "range" and first_day > last_day:
+            QMessageBox.warning(self, "Input Error", "The start date must not be after the end date.")
+            return
+
+        start, end = report_bounds(view, first_day, last_day)
+        self.run_btn.setEnabled(False)
+        self.summary_label.setText(f"Querying {len(db_paths)} campus databases...")
+        self.table_model.set_rows(FEDERATED_COLUMNS, [])
+        self.campuses = set()
+        self.worker = FederatedReportWorker(db_paths, start, end)
+        self.worker.rows_ready.connect(self.add_results)
+        self.worker.succeeded.connect(self.show_results)
+        self.worker.failed.connect(self.report_failed)
+        start_worker(self.worker)
+
+    def add_results(self, rows):
+        first_batch = not self.table_model.rows
+        self.table_model.append_rows(rows)
+        self.campuses.update(row[1] for row in rows)
+        if first_batch:
+            self.table.resizeColumnsToContents()
+        self.summary_label.setText(f"Loading... Time-ins so far: {len(self.table_model.rows)}")
+
+    def show_results(self):
+        self.run_btn.setEnabled(True)
+        self.summary_label.setText(
+            f"Time-ins: {len(self.table_model.rows)}    Campuses: {len(self.campuses)}"
+        )
+
+    def report_failed(self, error):
+        self.run_btn.setEnabled(True)
+        self.summary_label.setText("")
+        # Don't leave a partial report on screen
+        self.table_model.set_rows(FEDERATED_COLUMNS, [])
+        QMessageBox.critical(self, "Report Error", f"Failed to build multi-campus report:\n{error}")
+
+    def export_report(self):
+        """Export the merged report currently shown"""
+        if not self.run_btn.isEnabled():
+            QMessageBox.warning(self, "Report Loading", "Wait for the report to finish loading.")
+            return
+        if not self.table_model.rows:
+            QMessageBox.warning(self, "No Data", "There is no report data to export.")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save Multi-Campus Report CSV",
+            "Attendance_All_Campuses.csv",
+            "CSV Files (*.csv)"
+        )
+
+        if not path:
+            return
+
+        try:
+            with open(path, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(FEDERATED_HEADERS)
+                writer.writerows(format_row(row) for row in self.table_model.rows)
+
+            QMessageBox.information(
+                self,
+                "Export Successful",
+                "Multi-campus report has been saved successfully."
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", f"Failed to save report CSV:\n{e}")
+
+class AttendanceReportWindow(QWidget):
+    def __init__(self, matrix_store):
+        super().__init__()
+        self.matrix_store = matrix_store
+        self.worker = None
+        self.records = []
+        self.setWindowIcon(load_icon("Batangas_State_Logo.png"))
+        self.setWindowTitle("Attendance Report")
+        self.setGeometry(150, 150, 900, 600)
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.title = QLabel("Attendance Report")
+        self.title.setFont(QFont("Arial", 18, QFont.Bold))
+        self.title.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.title)
+
+        # Range controls
+        range_layout = QHBoxLayout()
+        today = QDate.currentDate()
+
+        range_layout.addWidget(QLabel("From:"))
+        self.from_date = QDateEdit()
+        self.from_date.setCalendarPopup(True)
+        self.from_date.setDisplayFormat("yyyy-MM-dd")
+        self.from_date.setDate(QDate(today.year(), today.month(), 1))
+        range_layout.addWidget(self.from_date)
+
+        range_layout.addWidget(QLabel("To:"))
+        self.to_date = QDateEdit()
+        self.to_date.setCalendarPopup(True)
+        self.to_date.setDisplayFormat("yyyy-MM-dd")
+        self.to_date.setDate(today)
+        range_layout.addWidget(self.to_date)
+
+        self.absentees_check = QCheckBox("Absentees only")
+        range_layout.addWidget(self.absentees_check)
+
+        self.generate_btn = QPushButton("Generate")
+        self.export_btn = QPushButton("Export CSV")
+        for btn in [self.generate_btn, self.export_btn]:
+            btn.setFixedWidth(120)
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #007bff;
+                    color: white;
+                    padding: 8px;
+                    font-weight: bold;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #0056b3;
+                }
+            """)
+        self.generate_btn.clicked.connect(self.generate_report)
+        self.export_btn.clicked.connect(self.export_report)
+        range_layout.addStretch()
+        range_layout.addWidget(self.generate_btn)
+        range_layout.addWidget(self.export_btn)
+        self.layout.addLayout(range_layout)
+
+        self.summary_label = QLabel()
+        self.summary_label.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.summary_label)
+
+        self.table = QTableView()
+        self.table_model = AttendanceTableModel(self)
+        self.table.setModel(self.table_model)
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
+        self.layout.addWidget(self.table)
+
+        self.generate_report()
+
+    def generate_report(self):
+        """Compute rates and streaks for the selected range"""
+        first_day = self.from_date.date().toPyDate()
+        last_day = self.to_date.date().toPyDate()
+        if first_day > last_day:
+            QMessageBox.warning(self, "Input Error", "The start date must not be after the end date.")
+            return
+
+        self.generate_btn.setEnabled(False)
+        self.summary_label.setText("Building attendance report...")
+        self.worker = AttendanceReportWorker(
+            self.matrix_store, first_day, last_day, self.absentees_check.isChecked()
+        )
+        self.worker.succeeded.connect(self.show_report)
+        self.worker.failed.connect(self.report_failed)
+        start_worker(self.worker)
+
+    def show_report(self, open_days, rows):
+        self.generate_btn.setEnabled(True)
+        if not self.absentees_check.isChecked():
+            # Lowest attendance first
+            rows.sort(key=lambda row: (row[3], row[0]))
+        self.records = rows
+        self.table_model.set_rows(REPORT_COLUMNS, rows)
+        self.table.resizeColumnsToContents()
+
+        absent = sum(1 for row in rows if row[2] == 0)
+        self.summary_label.setText(
+            f"Open days: {open_days}    Students: {len(rows)}    "
+            f"With no attendance: {absent}"
+        )
+
+    def report_failed(self, error):
+        self.generate_btn.setEnabled(True)
+        self.summary_label.setText("")
+        QMessageBox.critical(self, "Report Error", f"Failed to build attendance report:\n{error}")
+
+    def export_report(self):
+        """Export the report currently shown"""
+        if not self.records:
+            QMessageBox.warning(self, "No Data", "There is no report data to export.")
+            return
+
+        first_day = self.from_date.date().toString("yyyy-MM-dd")
+        last_day = self.to_date.date().toString("yyyy-MM-dd")
+        default_filename = f"Attendance_Report_{first_day}_to_{last_day}.csv"
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save Attendance Report CSV",
+            default_filename,
+            "CSV Files (*.csv)"
+        )
+
+        if not path:
+            return
+
+        try:
+            with open(path, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow([header for header, _ in REPORT_COLUMNS])
+                writer.writerows(self.table_model.formatted_rows())
+
+            QMessageBox.information(
+                self,
+                "Export Successful",
+                "Attendance report has been saved successfully."
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", f"Failed to save report CSV:\n{e}")
+
+class StudentHistoryWindow(QWidget):
+    def __init__(self, db_conn, sr_code):
+        super().__init__()
+        self.conn = db_conn
+        self.cursor = self.conn.cursor()
+        self.sr_code = sr_code
+        # For every page visited so far, the (ts, id) key its rows come after
+        # (None for the first page); the last entry is the page on screen
+        self.page_keys = [None]
+        self.next_key = None
+        self.setWindowIcon(load_icon("Batangas_State_Logo.png"))
+        self.setWindowTitle(f"Student History - {sr_code}")
+        self.setGeometry(150, 150, 600, 600)
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.title = QLabel()
+        self.title.setFont(QFont("Arial", 16, QFont.Bold))
+        self.title.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.title)
+
+        self.details_label = QLabel()
+        self.details_label.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.details_label)
+
+        self.totals_label = QLabel()
+        self.totals_label.setFont(QFont("Arial", 11, QFont.Bold))
+        self.totals_label.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.totals_label)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(2)
+        self.table.setHorizontalHeaderLabels(["Date", "Time-In (AM/PM)"])
+        self.layout.addWidget(self.table)
+
+        # Paging controls
+        paging_layout = QHBoxLayout()
+        self.newer_btn = QPushButton("< Newer")
+        self.older_btn = QPushButton("Older >")
+        for btn in [self.newer_btn, self.older_btn]:
+            btn.setFixedWidth(120)
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #6c757d;
+                    color: white;
+                    padding: 8px;
+                    font-weight: bold;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #5a6268;
+                }
+                QPushButton:disabled {
+                    background-color: #c8cbcf;
+                }
+            """)
+        self.newer_btn.clicked.connect(self.show_newer_page)
+        self.older_btn.clicked.connect(self.show_older_page)
+
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+
+        paging_layout.addWidget(self.newer_btn)
+        paging_layout.addStretch()
+        paging_layout.addWidget(self.page_label)
+        paging_layout.addStretch()
+        paging_layout.addWidget(self.older_btn)
+        self.layout.addLayout(paging_layout)
+
+        self.load_summary()
+        self.load_page()
+
+    def load_summary(self):
+        """Show student details and precomputed visit totals"""
+        try:
+            student = fetch_student(self.cursor, self.sr_code)
+            if student:
+                full_name, college, program, campus = student
+                self.title.setText(f"{full_name} ({self.sr_code})")
+                self.details_label.setText(
+                    " | ".join(str(part) for part in (college, program, campus) if part)
+                )
+
+            totals = student_visit_totals(self.cursor, self.sr_code)
+            self.totals_label.setText(
+                f"This month: {totals['month']}    "
+                f"This semester: {totals['semester']}    "
+                f"All time: {totals['total']}"
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to load student details:\n{e}")
+
+    def load_page(self):
+        """Load the page starting at the last key on the page stack"""
+        try:
+            rows, self.next_key = fetch_student_history(
+                self.cursor, self.sr_code, after=self.page_keys[-1]
+            )
+
+            self.table.setRowCount(len(rows))
+            for row_idx, row_data in enumerate(rows):
+                for col_idx, col_data in enumerate(row_data):
+                    self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
+            self.table.resizeColumnsToContents()
+
+            self.page_label.setText(f"Page {len(self.page_keys)}")
+            self.newer_btn.setEnabled(len(self.page_keys) > 1)
+            self.older_btn.setEnabled(self.next_key is not None)
+
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to load student history:\n{e}")
+
+    def show_older_page(self):
+        if self.next_key is None:
+            return
+        self.page_keys.append(self.next_key)
+        self.load_page()
+
+    def show_newer_page(self):
+        if len(self.page_keys) <= 1:
+            return
+        self.page_keys.pop()
+        self.load_page()
+
 class LoginPage(QWidget):
     def __init__(self, conn, parent=None):
         super().__init__(parent)
@@ -553,7 +1324,9 @@ class AttendanceApp(QWidget):
         self.connect_db()
         self.set_background_image("ATTENDANCE.png")
         self.init_ui()
+        self.maintenance = MaintenanceScheduler(self.db_path)
         self.setup_timer()
+        self.setup_event_feed()
 
     def set_background_image(self, image_path):
         self.background_pixmap = load_pixmap(image_path)
@@ -583,15 +1356,41 @@ class AttendanceApp(QWidget):
             if not os.path.exists(db_path):
                 self.create_database(db_path)
                 
+            self.db_path = db_path
             self.conn = sqlite3.connect(db_path)
             self.cursor = self.conn.cursor()
             self.cursor.execute("PRAGMA foreign_keys = ON")
             self.conn.commit()
+
+            # Bring databases created by older versions up to date
+            self.upgrade_database()
             
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Could not connect to database:\n{e}")
             sys.exit()
 
+    def upgrade_database(self):
+        """Run ensure_schema, showing progress while an old time_tbl is converted"""
+        if not has_legacy_time_tbl(self.cursor):
+            ensure_schema(self.conn)
+            return
+
+        dialog = QProgressDialog("Upgrading the attendance database...", None, 0, 0, self)
+        dialog.setWindowTitle("Attendance System")
+        dialog.setWindowModality(Qt.ApplicationModal)
+        dialog.setMinimumDuration(0)
+        dialog.show()
+
+        def progress(done, total):
+            dialog.setMaximum(total)
+            dialog.setValue(done)
+            QApplication.processEvents()
+
+        try:
+            ensure_schema(self.conn, progress)
+        finally:
+            dialog.close()
+
     def create_database(self, db_path):
         """Create database tables if they don't exist"""
         conn = sqlite3.connect(db_path)
@@ -609,15 +1408,8 @@ class AttendanceApp(QWidget):
         """)
         
         # Create time_tbl
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS time_tbl (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sr_code TEXT NOT NULL,
-            time_in TEXT NOT NULL,
-            date_in TEXT NOT NULL,
-            FOREIGN KEY (sr_code) REFERENCES name_tbl(sr_code)
-        )
-        """)
+        create_time_tbl(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         
         # Create admin_tbl
         cursor.execute("""
@@ -636,6 +1428,17 @@ class AttendanceApp(QWidget):
         conn.commit()
         conn.close()
 
+    def setup_event_feed(self):
+        """Publish time-ins on the event bus and stream them over local HTTP"""
+        self.event_bus = EventBus()
+        try:
+            self.event_server = EventStreamServer(self.event_bus)
+            self.event_server.start()
+        except OSError as e:
+            # e.g. another kiosk instance already owns the port
+            print(f"Warning: Live event feed unavailable: {e}")
+            self.event_server = None
+
     def setup_timer(self):
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_time)
@@ -647,6 +1450,8 @@ class AttendanceApp(QWidget):
         utc_time = QDateTime.currentDateTimeUtc()
         ph_time = utc_time.addSecs(8 * 3600)  # Add 8 hours for Philippine Time
         self.time_label.setText(ph_time.toString("h:mm:ss AP"))
+        # Start background upkeep once the kiosk has been idle for a while
+        self.maintenance.poll()
 
     def init_ui(self):
         main_layout = QVBoxLayout(self)
@@ -788,18 +1593,14 @@ class AttendanceApp(QWidget):
         self.login_page.show()
 
     def mark_attendance(self):
+        # Any running maintenance job yields before we touch the database
+        self.maintenance.notify_scan()
         sr_code = self.sr_input.text().strip()
         if not sr_code:
             QMessageBox.warning(self, "Input Error", "Please enter your SR CODE.")
             return
 
         try:
-            # Get current Philippine time (UTC+8)
-            utc_now = datetime.now(timezone.utc)
-            ph_time = utc_now + timedelta(hours=8)  # Convert to Philippine Time
-            time_str = ph_time.strftime('%Y-%m-%d %H:%M:%S')
-            date_str = ph_time.strftime('%Y-%m-%d')
-
             self.cursor.execute('SELECT full_name FROM name_tbl WHERE sr_code = ?', (sr_code,))
             result = self.cursor.fetchone()
 
@@ -810,11 +1611,20 @@ class AttendanceApp(QWidget):
             full_name = result[0]
 
             try:
-                # Insert with explicit Philippine time
-                self.cursor.execute('INSERT INTO time_tbl (sr_code, time_in, date_in) VALUES (?, ?, ?)', 
-                                   (sr_code, time_str, date_str))
+                ts = now_ts()
+                time_in_id = insert_time_in(self.cursor, sr_code, ts)
                 self.conn.commit()
 
+                # Only committed time-ins reach the live feed
+                self.event_bus.publish({
+                    "id": time_in_id,
+                    "sr_code": sr_code,
+                    "full_name": full_name,
+                    "ts": ts,
+                    "date": format_date(ts),
+                    "time": format_time(ts),
+                })
+
                 self.status_label.setText(
                     f"<b>{full_name.upper()} ({sr_code})</b>"
                 )
@@ -833,12 +1643,20 @@ class AttendanceApp(QWidget):
             QMessageBox.critical(self, "Database Error", f"Error while checking SR CODE:\n{query_error}")
 
     def closeEvent(self, event):
+        self.maintenance.stop()
+        if self.event_server is not None:
+            self.event_server.stop()
+        if not wait_for_workers(WORKER_SHUTDOWN_TIMEOUT):
+            print("Warning: Background work was still running when the kiosk closed")
         if hasattr(self, 'conn'):
             self.cursor.close()
             self.conn.close()
         event.accept()
 
 if __name__ == "__main__":
+    # Needed for the report process pool in the frozen Windows build
+    multiprocessing.freeze_support()
+
     # Verify all required resources exist (except database which we'll handle specially)
     required_resources = [
         "ATTENDANCE.png",
@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from db import PH_OFFSET, day_start_ts, ph_now
+
+# time_tbl rows read per round trip while updating
+FETCH_CHUNK = 50000
+
+
+class AttendanceMatrix:
+    """Per-student attendance bitsets, one bit per day.
+
+    Row i of `bits` belongs to sr_codes[i]; bit d (little-endian within each
+    byte) is set if the student timed in on start_day + d. The matrix is
+    updated incrementally: update() only reads roster entries and time_tbl
+    rows it has not seen yet, so refreshing it is cheap after the first
+    build. Queries work on whole columns at once with NumPy.
+    """
+    def __init__(self, start_day):
+        self.start_day = start_day
+        self.start_ts = day_start_ts(start_day)
+        self.num_days = 0
+        self.sr_codes = []
+        self.names = []
+        self.row_of = {}
+        self.bits = np.zeros((0, 0), dtype=np.uint8)
+        self.last_id = 0
+
+    @classmethod
+    def for_database(cls, cursor, default_day):
+        """Create a matrix starting at the earliest time-in on record"""
+        cursor.execute("SELECT MIN(ts) FROM time_tbl")
+        first_ts = cursor.fetchall()[0][0]
+        if first_ts is None:
+            start_day = default_day
+        else:
+            start_day = date(1970, 1, 1) + timedelta(days=(first_ts + PH_OFFSET) // 86400)
+        return cls(start_day)
+
+    def day_index(self, day):
+        return (day - self.start_day).days
+
+    def update(self, cursor):
+        """Add new students and set bits for time-ins recorded since the last update"""
+        cursor.execute("SELECT sr_code, full_name FROM name_tbl")
+        new_students = []
+        for sr_code, full_name in cursor.fetchall():
+            row = self.row_of.get(sr_code)
+            if row is None:
+                new_students.append((sr_code, full_name))
+            else:
+                # Names may have been corrected by a re-import
+                self.names[row] = full_name
+        if new_students:
+            self._grow(len(self.sr_codes) + len(new_students), self.num_days)
+            for sr_code, full_name in new_students:
+                self.row_of[sr_code] = len(self.sr_codes)
+                self.sr_codes.append(sr_code)
+                self.names.append(full_name)
+
+        cursor.execute(
+            "SELECT id, sr_code, ts FROM time_tbl WHERE id > ? ORDER BY id",
+            (self.last_id,)
+        )
+        while True:
+            chunk = cursor.fetchmany(FETCH_CHUNK)
+            if not chunk:
+                break
+            self.last_id = chunk[-1][0]
+            self._set_bits(chunk)
+
+    def _set_bits(self, chunk):
+        _, sr_codes, stamps = zip(*chunk)
+        days = (np.fromiter(stamps, dtype=np.int64, count=len(stamps)) - self.start_ts) // 86400
+        rows = np.fromiter(
+            (self.row_of.get(sr_code, -1) for sr_code in sr_codes),
+            dtype=np.int64, count=len(sr_codes)
+        )
+        # Drop students missing from the roster and days before start_day
+        keep = (rows >= 0) & (days >= 0)
+        rows = rows[keep]
+        days = days[keep]
+        if rows.size == 0:
+            return
+
+        needed_days = int(days.max()) + 1
+        if needed_days > self.num_days:
+            self._grow(len(self.sr_codes), needed_days)
+
+        masks = np.left_shift(1, days & 7).astype(np.uint8)
+        np.bitwise_or.at(self.bits, (rows, days >> 3), masks)
+
+    def _grow(self, num_students, num_days):
+        """Resize the bit array, keeping existing bits"""
+        num_bytes = (num_days + 7) // 8
+        if num_students > self.bits.shape[0] or num_bytes > self.bits.shape[1]:
+            grown = np.zeros(
+                (max(num_students, self.bits.shape[0]), max(num_bytes, self.bits.shape[1])),
+                dtype=np.uint8
+            )
+            grown[:self.bits.shape[0], :self.bits.shape[1]] = self.bits
+            self.bits = grown
+        self.num_days = max(self.num_days, num_days)
+
+    def days_matrix(self, first_day, last_day):
+        """Boolean (students x days) matrix for an inclusive date range"""
+        first = self.day_index(first_day)
+        last = self.day_index(last_day)
+        width = last - first + 1
+        result = np.zeros((len(self.sr_codes), max(width, 0)), dtype=bool)
+        # Only the part of the range the matrix actually covers can have bits
+        lo = max(first, 0)
+        hi = min(last + 1, self.num_days)
+        if hi > lo and result.shape[0]:
+            unpacked = np.unpackbits(
+                self.bits[:, lo // 8:(hi + 7) // 8], axis=1, bitorder="little"
+            )
+            offset = lo - (lo // 8) * 8
+            result[:, lo - first:hi - first] = unpacked[:, offset:offset + hi - lo]
+        return result
+
+    def report(self, first_day, last_day):
+        """Attendance rate and streaks for every student in a date range.
+
+        Only open days (days on which anyone timed in) count towards the rate
+        and streaks, so weekends and holidays are not held against students.
+        Returns (open_days, rows) where rows are
+        (sr_code, full_name, days_attended, rate, current_streak, longest_streak).
+        """
+        attended = self.days_matrix(first_day, last_day)
+        open_mask = attended.any(axis=0)
+        attended = attended[:, open_mask]
+        open_days = attended.shape[1]
+
+        days_attended = attended.sum(axis=1)
+        if open_days:
+            rates = days_attended / open_days
+        else:
+            rates = np.zeros(len(self.sr_codes))
+
+        current = np.zeros(len(self.sr_codes), dtype=np.int64)
+        longest = np.zeros(len(self.sr_codes), dtype=np.int64)
+        for column in attended.T:
+            current = (current + 1) * column
+            np.maximum(longest, current, out=longest)
+
+        rows = list(zip(
+            self.sr_codes, self.names, days_attended.tolist(), rates.tolist(),
+            current.tolist(), longest.tolist()
+        ))
+        return open_days, rows
+
+    def absentees(self, first_day, last_day):
+        """SR codes of students with no time-in at all in a date range"""
+        attended = self.days_matrix(first_day, last_day)
+        absent_rows = np.flatnonzero(~attended.any(axis=1))
+        return [self.sr_codes[row] for row in absent_rows]
+
+
+class AttendanceMatrixStore:
+    """Keeps one AttendanceMatrix for a database and builds reports from it.
+
+    report() opens its own connection, so it can run on a worker thread; the
+    lock keeps two reports from updating the matrix at once. reset() only
+    bumps a generation counter, so the UI never waits on a build in progress;
+    the next report notices and rebuilds from scratch.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.matrix = None
+        self.generation = 0
+        self.built_generation = None
+
+    def reset(self):
+        """Forget the matrix, e.g. after the database was restored"""
+        self.generation += 1
+
+    def report(self, first_day, last_day, absentees_only=False):
+        """(open_days, rows) as in AttendanceMatrix.report, optionally only absentees"""
+        with self.lock:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                cursor = conn.cursor()
+                generation = self.generation
+                if self.matrix is None or self.built_generation != generation:
+                    self.matrix = AttendanceMatrix.for_database(cursor, ph_now().date())
+                    self.built_generation = generation
+                self.matrix.update(cursor)
+            finally:
+                conn.close()
+
+            open_days, rows = self.matrix.report(first_day, last_day)
+            if absentees_only:
+                absent = set(self.matrix.absentees(first_day, last_day))
+                rows = [row for row in rows if row[0] in absent]
+            return open_days, rows
@@ -0,0 +1,187 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from db import SCHEMA_VERSION, ensure_schema, get_persistent_db_path, ph_now
+
+BACKUP_KEEP = 14
+BACKUP_PREFIX = "attendance_"
+
+
+class BackupError(Exception):
+    """Raised when a backup copy fails its integrity check"""
+
+
+def default_backup_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+
+
+def copy_database(source, target):
+    """Copy one open connection into another in a single step.
+
+    A backup copied a few pages at a time starts over whenever another
+    connection writes to the source, so during a rush it may never finish.
+    In WAL mode (see ensure_schema) one step reads a consistent snapshot
+    without blocking the kiosk's inserts.
+    """
+    source.backup(target, pages=-1)
+
+
+def check_integrity(path):
+    """Raise BackupError unless the database file passes PRAGMA integrity_check"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    if result != [("ok",)]:
+        problems = "; ".join(row[0] for row in result[:5])
+        raise BackupError(f"Integrity check failed for {path}: {problems}")
+
+
+def check_attendance_database(path):
+    """Raise BackupError unless path looks like an attendance database this version can open"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        }
+        version = conn.execute("PRAGMA user_version").fetchall()[0][0]
+    finally:
+        conn.close()
+
+    missing = {"name_tbl", "time_tbl"} - tables
+    if missing:
+        raise BackupError(f"{path} is not an attendance database (missing {', '.join(sorted(missing))})")
+    if version > SCHEMA_VERSION:
+        raise BackupError(
+            f"{path} was written by a newer version of the app (schema {version}, expected {SCHEMA_VERSION})"
+        )
+
+
+def list_backups(backup_dir):
+    """Backup files in backup_dir, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [
+        name for name in os.listdir(backup_dir)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(".db")
+    ]
+    # Timestamped names sort chronologically
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate_backups(backup_dir, keep=BACKUP_KEEP):
+    """Delete all but the newest `keep` backups"""
+    for path in list_backups(backup_dir)[keep:]:
+        os.remove(path)
+
+
+def backup_database(db_path, backup_dir=None, keep=BACKUP_KEEP, label=""):
+    """Take an online backup of db_path and return the new backup's path.
+
+    The copy is written under a temporary name, checked with
+    PRAGMA integrity_check and only then renamed into place, so a listed
+    backup is always complete. Older backups beyond `keep` are removed.
+    """
+    backup_dir = backup_dir or default_backup_dir(db_path)
+    os.makedirs(backup_dir, exist_ok=True)
+
+    stamp = ph_now().strftime("%Y%m%d_%H%M%S")
+    suffix = f"_{label}" if label else ""
+    path = os.path.join(backup_dir, f"{BACKUP_PREFIX}{stamp}{suffix}.db")
+    partial_path = path + ".partial"
+
+    source = sqlite3.connect(db_path, timeout=30)
+    target = sqlite3.connect(partial_path)
+    try:
+        copy_database(source, target)
+        # A standalone copy should not need -wal/-shm files next to it
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        check_integrity(partial_path)
+    except Exception:
+        os.remove(partial_path)
+        raise
+    os.replace(partial_path, path)
+
+    rotate_backups(backup_dir, keep)
+    return path
+
+
+def latest_backup_age(backup_dir):
+    """Seconds since the newest backup was written, or None if there is none"""
+    backups = list_backups(backup_dir)
+    if not backups:
+        return None
+    return time.time() - os.path.getmtime(backups[0])
+
+
+def restore_database(backup_path, target):
+    """Overwrite a database with a verified backup.
+
+    `target` is either a path or an open connection; passing the kiosk's own
+    connection restores in place without reopening it. Backups from before
+    the current schema are upgraded after the copy.
+    """
+    check_integrity(backup_path)
+    check_attendance_database(backup_path)
+
+    source = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+    own_target = isinstance(target, str)
+    if own_target:
+        target = sqlite3.connect(target, timeout=30)
+    try:
+        copy_database(source, target)
+        ensure_schema(target)
+    finally:
+        source.close()
+        if own_target:
+            target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up or restore the attendance database")
+    parser.add_argument("--db", default=get_persistent_db_path(), help="database to back up or restore into")
+    parser.add_argument("--dir", help="backup directory (default: backups next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup_cmd = commands.add_parser("backup", help="take a backup now")
+    backup_cmd.add_argument("--keep", type=int, default=BACKUP_KEEP, help="number of backups to keep")
+
+    commands.add_parser("list", help="list existing backups")
+
+    restore_cmd = commands.add_parser("restore", help="restore a backup over the database")
+    restore_cmd.add_argument("backup_path")
+
+    check_cmd = commands.add_parser("check", help="run an integrity check on a backup")
+    check_cmd.add_argument("backup_path")
+
+    args = parser.parse_args()
+    backup_dir = args.dir or default_backup_dir(args.db)
+
+    if args.command == "backup":
+        print(f"Backup written to {backup_database(args.db, backup_dir, keep=args.keep)}")
+    elif args.command == "list":
+        for path in list_backups(backup_dir):
+            print(path)
+    elif args.command == "restore":
+        try:
+            check_integrity(args.backup_path)
+            check_attendance_database(args.backup_path)
+        except (BackupError, sqlite3.DatabaseError) as e:
+            parser.error(str(e))
+        # Keep what is being overwritten in case the wrong backup was picked
+        safety = backup_database(args.db, backup_dir, label="pre_restore")
+        restore_database(args.backup_path, args.db)
+        print(f"Restored {args.backup_path} (previous data saved to {safety})")
+    elif args.command == "check":
+        check_integrity(args.backup_path)
+        print(f"{args.backup_path}: ok")
@@ -0,0 +1,180 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+from datetime import date, datetime
+
+from db import (
+    ensure_schema, fetch_daily_attendance, fetch_monthly_attendance, format_date,
+    format_time, has_legacy_time_tbl, insert_time_in, now_ts
+)
+
+# Converts a copy of a legacy (time_in/date_in) database and checks that the
+# converted data reads back exactly as the old queries showed it. The
+# original file is never modified. Rows without a time_in are expected to
+# take their time from date_in, as the migration does.
+
+LEGACY_DAILY_SQL = """
+    SELECT t.sr_code, n.full_name, n.College, n.PROGRAM,
+           COALESCE(t.time_in, t.date_in)
+    FROM time_tbl t
+    JOIN name_tbl n ON t.sr_code = n.sr_code
+    WHERE date(t.date_in) = ?
+"""
+
+LEGACY_MONTHLY_SQL = """
+    SELECT date(date_in), t.sr_code, n.full_name, n.College, n.PROGRAM,
+           COALESCE(time_in, date_in)
+    FROM time_tbl t
+    JOIN name_tbl n ON t.sr_code = n.sr_code
+    WHERE strftime('%m', date_in) = ? AND strftime('%Y', date_in) = ?
+"""
+
+
+def legacy_clock(text):
+    """Legacy text timestamp as the old views' strftime('%I:%M:%S %p') showed it"""
+    # Formatted here because SQLite only supports %I and %p since 3.44
+    return datetime.fromisoformat(text).strftime("%I:%M:%S %p")
+
+
+def legacy_rows(cursor, sql, params):
+    """Run a legacy query whose last column is a raw timestamp, formatting it"""
+    return Counter(
+        row[:-1] + (legacy_clock(row[-1]),)
+        for row in cursor.execute(sql, params).fetchall()
+    )
+
+
+def legacy_snapshot(cursor):
+    """Everything the old version showed, read before converting"""
+    rows = {
+        row_id: (sr_code, day, legacy_clock(stamp))
+        for row_id, sr_code, day, stamp in cursor.execute("""
+            SELECT id, sr_code, date(date_in), COALESCE(time_in, date_in)
+            FROM time_tbl
+            WHERE sr_code IS NOT NULL AND COALESCE(time_in, date_in) IS NOT NULL
+        """).fetchall()
+    }
+    days = [row[0] for row in cursor.execute(
+        "SELECT DISTINCT date(date_in) FROM time_tbl WHERE date_in IS NOT NULL"
+    ).fetchall()]
+    months = [row[0] for row in cursor.execute(
+        "SELECT DISTINCT strftime('%Y-%m', date_in) FROM time_tbl WHERE date_in IS NOT NULL"
+    ).fetchall()]
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'time_tbl'").fetchall()
+
+    return {
+        "rows": rows,
+        "daily": {day: legacy_rows(cursor, LEGACY_DAILY_SQL, (day,)) for day in days},
+        "monthly": {
+            month: legacy_rows(cursor, LEGACY_MONTHLY_SQL, (month[5:], month[:4]))
+            for month in months
+        },
+        "visits": Counter({
+            (sr_code, month): visits
+            for sr_code, month, visits in cursor.execute("""
+                SELECT sr_code, strftime('%Y-%m', COALESCE(time_in, date_in)), COUNT(*)
+                FROM time_tbl
+                WHERE sr_code IS NOT NULL AND COALESCE(time_in, date_in) IS NOT NULL
+                GROUP BY 1, 2
+            """).fetchall()
+        }),
+        "seq": seq[0][0] if seq else 0,
+    }
+
+
+def check_converted(cursor, before):
+    """List of differences between the converted data and the legacy snapshot"""
+    problems = []
+
+    rows = {
+        row_id: (sr_code, format_date(ts), format_time(ts))
+        for row_id, sr_code, ts in cursor.execute("SELECT id, sr_code, ts FROM time_tbl").fetchall()
+    }
+    if rows.keys() != before["rows"].keys():
+        problems.append(
+            f"ids differ: {len(before['rows'].keys() - rows.keys())} missing, "
+            f"{len(rows.keys() - before['rows'].keys())} unexpected"
+        )
+    changed = [row_id for row_id in rows.keys() & before["rows"].keys() if rows[row_id] != before["rows"][row_id]]
+    for row_id in changed[:5]:
+        problems.append(f"row {row_id}: was {before['rows'][row_id]}, now {rows[row_id]}")
+    if len(changed) > 5:
+        problems.append(f"... {len(changed) - 5} more changed rows")
+
+    for day, expected in before["daily"].items():
+        got = Counter(
+            (sr_code, full_name, college, program, format_time(ts))
+            for sr_code, full_name, college, program, ts
+            in fetch_daily_attendance(cursor, date.fromisoformat(day))
+        )
+        if got != expected:
+            problems.append(f"daily view for {day} differs ({sum(got.values())} vs {sum(expected.values())} rows)")
+
+    for month, expected in before["monthly"].items():
+        got = Counter(
+            (format_date(ts), sr_code, full_name, college, program, format_time(ts))
+            for ts, sr_code, full_name, college, program
+            in fetch_monthly_attendance(cursor, int(month[:4]), int(month[5:]))
+        )
+        if got != expected:
+            problems.append(f"monthly view for {month} differs ({sum(got.values())} vs {sum(expected.values())} rows)")
+
+    visits = Counter({
+        (sr_code, month): count
+        for sr_code, month, count in cursor.execute(
+            "SELECT sr_code, month, visits FROM visit_count_tbl"
+        ).fetchall()
+    })
+    if visits != before["visits"]:
+        problems.append(f"visit_count_tbl differs in {len(set(visits.items()) ^ set(before['visits'].items()))} entries")
+
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'time_tbl'").fetchall()
+    seq = seq[0][0] if seq else 0
+    if seq < before["seq"]:
+        problems.append(f"sqlite_sequence went back from {before['seq']} to {seq}")
+
+    # A new time-in must not reuse an id from before the conversion
+    cursor.execute("INSERT OR IGNORE INTO name_tbl (sr_code, full_name) VALUES ('MIGRATION-CHECK', 'Check')")
+    new_id = insert_time_in(cursor, "MIGRATION-CHECK", now_ts())
+    if new_id <= before["seq"]:
+        problems.append(f"new time-in got id {new_id}, not above the old sequence {before['seq']}")
+
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a copy of a legacy attendance database and verify it")
+    parser.add_argument("db_path", nargs="?", default="attendance.db")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="attendance_check_")
+    try:
+        copy_path = os.path.join(workdir, "attendance.db")
+        shutil.copyfile(args.db_path, copy_path)
+        conn = sqlite3.connect(copy_path)
+        cursor = conn.cursor()
+        # As the kiosk connects
+        cursor.execute("PRAGMA foreign_keys = ON")
+        if not has_legacy_time_tbl(cursor):
+            parser.error(f"{args.db_path} already uses the compact schema")
+
+        before = legacy_snapshot(cursor)
+        ensure_schema(conn)
+        problems = check_converted(cursor, before)
+        conn.rollback()
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if problems:
+        for problem in problems:
+            print(problem)
+        sys.exit(1)
+    print(
+        f"OK: {len(before['rows'])} time-ins, {len(before['daily'])} days and "
+        f"{len(before['monthly'])} months read back unchanged"
+    )
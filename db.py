@@ -0,0 +1,459 @@
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+HISTORY_PAGE_SIZE = 50
+
+# PRAGMA user_version of the current layout:
+#   0 - time_tbl stores time_in/date_in as 'YYYY-MM-DD HH:MM:SS' text
+#   1 - time_tbl stores a single integer UTC epoch in ts
+SCHEMA_VERSION = 1
+
+# Philippine time (UTC+8), used for day boundaries and display
+PH_OFFSET = 8 * 3600
+
+MIGRATION_BATCH_SIZE = 5000
+
+TIME_TBL_SQL = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sr_code TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    FOREIGN KEY (sr_code) REFERENCES name_tbl(sr_code)
+)
+"""
+
+
+def get_persistent_db_path():
+    """Get a persistent database path that works across platforms"""
+    # Lets tools such as the load simulator run against a scratch database
+    override = os.getenv("ATTENDANCE_DB_PATH")
+    if override:
+        return override
+
+    if sys.platform == "win32":
+        # On Windows, use AppData/Local
+        base_path = os.getenv('LOCALAPPDATA')
+        app_path = os.path.join(base_path, "AttendanceSystem")
+    else:
+        # On Linux/Mac, use home directory
+        base_path = os.path.expanduser("~")
+        app_path = os.path.join(base_path, ".attendance_system")
+
+    # Create directory if it doesn't exist
+    os.makedirs(app_path, exist_ok=True)
+
+    return os.path.join(app_path, "attendance.db")
+
+
+def database_path(conn):
+    """File path of the main database behind an open connection"""
+    for _, name, path in conn.execute("PRAGMA database_list").fetchall():
+        if name == "main":
+            return path
+    return None
+
+
+def ph_now():
+    """Current Philippine time (UTC+8) as a naive datetime"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=8)
+
+
+def now_ts():
+    """Current time as an integer epoch for time_tbl.ts"""
+    return int(time.time())
+
+
+def format_time(ts):
+    """Format a time_tbl.ts epoch as a 12-hour Philippine time"""
+    return time.strftime("%I:%M:%S %p", time.gmtime(ts + PH_OFFSET))
+
+
+def format_date(ts):
+    """Format a time_tbl.ts epoch as a Philippine 'YYYY-MM-DD' date"""
+    return time.strftime("%Y-%m-%d", time.gmtime(ts + PH_OFFSET))
+
+
+def day_start_ts(day):
+    """Epoch of midnight Philippine time at the start of day"""
+    return (day - date(1970, 1, 1)).days * 86400 - PH_OFFSET
+
+
+def day_bounds(day):
+    """Return the [start, end) epoch range covering one Philippine day"""
+    start = day_start_ts(day)
+    return start, start + 86400
+
+
+def month_bounds(year, month):
+    """Return the [start, end) epoch range covering one Philippine month"""
+    if month == 12:
+        next_month = date(year + 1, 1, 1)
+    else:
+        next_month = date(year, month + 1, 1)
+    return day_start_ts(date(year, month, 1)), day_start_ts(next_month)
+
+
+def create_time_tbl(cursor):
+    """Create time_tbl and its covering indexes in the current layout"""
+    cursor.execute(TIME_TBL_SQL.format(name="time_tbl"))
+    create_time_tbl_indexes(cursor)
+
+
+def create_time_tbl_indexes(cursor):
+    # Day and month views scan a ts range and only need sr_code to join
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_time_tbl_ts
+    ON time_tbl (ts, sr_code)
+    """)
+    # Keyset pagination over one student's history walks this index
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_time_tbl_sr_code_ts
+    ON time_tbl (sr_code, ts)
+    """)
+
+
+def schema_version(cursor):
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+
+def has_legacy_time_tbl(cursor):
+    """True if time_tbl still stores time_in/date_in text columns"""
+    cursor.execute("PRAGMA table_info(time_tbl)")
+    return any(column[1] == "time_in" for column in cursor.fetchall())
+
+
+def migrate_time_tbl(conn, batch_size=MIGRATION_BATCH_SIZE, pause=0.0, progress=None):
+    """Convert a text-timestamp time_tbl to the integer epoch layout.
+
+    Rows are copied into time_tbl_v1 in short id-ordered batches, each in its
+    own transaction, so other connections are only ever blocked for one
+    batch. The copy resumes where it left off if interrupted. The final swap
+    takes a write lock, copies anything inserted meanwhile and replaces the
+    old table; a kiosk of an older version must not be running, as its
+    inserts fail once the old columns are gone. The space the old table
+    used is left free until the file is vacuumed.
+    """
+    cursor = conn.cursor()
+    # Old logs may reference students no longer in name_tbl; copy them as they are
+    foreign_keys = cursor.execute("PRAGMA foreign_keys").fetchall()[0][0]
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    try:
+        _migrate_time_tbl(conn, cursor, batch_size, pause, progress)
+    finally:
+        cursor.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+
+
+def _migrate_time_tbl(conn, cursor, batch_size, pause, progress):
+    cursor.execute(TIME_TBL_SQL.format(name="time_tbl_v1"))
+    conn.commit()
+
+    # fetchall() everywhere so no half-read statement keeps a shared lock
+    # that would deadlock against the kiosk's commit
+    total = cursor.execute("SELECT COUNT(*) FROM time_tbl").fetchall()[0][0]
+    last_id = cursor.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM time_tbl_v1"
+    ).fetchall()[0][0]
+
+    while True:
+        # Take the write lock up front instead of upgrading a read lock
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            upper_id, batch_rows = cursor.execute("""
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM time_tbl WHERE id > ? ORDER BY id LIMIT ?
+                )
+            """, (last_id, batch_size)).fetchall()[0]
+            if upper_id is not None:
+                _copy_legacy_rows(cursor, last_id, upper_id)
+                last_id = upper_id
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        # A short batch means we have caught up; the swap copies the rest
+        if batch_rows < batch_size:
+            break
+
+        if progress:
+            progress(cursor.execute("SELECT COUNT(*) FROM time_tbl_v1").fetchall()[0][0], total)
+        if pause:
+            time.sleep(pause)
+
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        max_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM time_tbl").fetchall()[0][0]
+        _copy_legacy_rows(cursor, last_id, max_id)
+
+        # Keep AUTOINCREMENT from reusing ids of rows deleted before the move
+        row = cursor.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'time_tbl'"
+        ).fetchall()
+        old_seq = row[0][0] if row else 0
+
+        cursor.execute("DROP TABLE time_tbl")
+        cursor.execute("ALTER TABLE time_tbl_v1 RENAME TO time_tbl")
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'time_tbl'",
+            (old_seq,)
+        )
+        create_time_tbl_indexes(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _copy_legacy_rows(cursor, after_id, upper_id):
+    # Legacy time_in holds Philippine wall-clock time
+    cursor.execute(f"""
+        INSERT OR IGNORE INTO time_tbl_v1 (id, sr_code, ts)
+        SELECT id, sr_code,
+               CAST(strftime('%s', COALESCE(time_in, date_in)) AS INTEGER) - {PH_OFFSET}
+        FROM time_tbl
+        WHERE id > ? AND id <= ?
+          AND sr_code IS NOT NULL
+          AND COALESCE(time_in, date_in) IS NOT NULL
+    """, (after_id, upper_id))
+
+
+def ensure_schema(conn, progress=None):
+    """Upgrade older databases and add indexes, rollups and triggers"""
+    cursor = conn.cursor()
+
+    if schema_version(cursor) < SCHEMA_VERSION:
+        if has_legacy_time_tbl(cursor):
+            migrate_time_tbl(conn, progress=progress)
+        else:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    create_time_tbl_indexes(cursor)
+    # Superseded by the ts indexes
+    cursor.execute("DROP INDEX IF EXISTS idx_time_tbl_sr_code")
+    cursor.execute("DROP INDEX IF EXISTS idx_time_tbl_sr_code_time_in")
+
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visit_count_tbl'"
+    )
+    has_rollup = cursor.fetchone() is not None
+
+    # Per-student monthly visit counts, kept in sync by the triggers below
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS visit_count_tbl (
+        sr_code TEXT NOT NULL,
+        month TEXT NOT NULL,
+        visits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (sr_code, month)
+    ) WITHOUT ROWID
+    """)
+
+    if not has_rollup:
+        # Backfill from the existing logs the first time the rollup is created
+        cursor.execute(f"""
+        INSERT INTO visit_count_tbl (sr_code, month, visits)
+        SELECT sr_code, strftime('%Y-%m', ts + {PH_OFFSET}, 'unixepoch'), COUNT(*)
+        FROM time_tbl
+        GROUP BY 1, 2
+        """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_time_tbl_visit_insert
+    AFTER INSERT ON time_tbl
+    BEGIN
+        INSERT INTO visit_count_tbl (sr_code, month, visits)
+        VALUES (NEW.sr_code, strftime('%Y-%m', NEW.ts + {PH_OFFSET}, 'unixepoch'), 1)
+        ON CONFLICT (sr_code, month) DO UPDATE SET visits = visits + 1;
+    END
+    """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_time_tbl_visit_delete
+    AFTER DELETE ON time_tbl
+    BEGIN
+        UPDATE visit_count_tbl SET visits = visits - 1
+        WHERE sr_code = OLD.sr_code
+          AND month = strftime('%Y-%m', OLD.ts + {PH_OFFSET}, 'unixepoch');
+    END
+    """)
+
+    conn.commit()
+
+    # Readers (dashboard, backups, reports) no longer block kiosk writes
+    cursor.execute("PRAGMA journal_mode = WAL")
+
+
+def insert_time_in(cursor, sr_code, ts):
+    """Record a time-in and return its time_tbl id"""
+    cursor.execute("INSERT INTO time_tbl (sr_code, ts) VALUES (?, ?)", (sr_code, ts))
+    return cursor.lastrowid
+
+
+def latest_time_in_id(cursor):
+    """Highest time_tbl id, used to tell whether today's results changed"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM time_tbl")
+    return cursor.fetchall()[0][0]
+
+
+def fetch_daily_attendance(cursor, day):
+    """Return (sr_code, full_name, College, PROGRAM, ts) rows for one day, newest first"""
+    start, end = day_bounds(day)
+    cursor.execute("""
+        SELECT
+            t.sr_code,
+            n.full_name,
+            n.College,
+            n.PROGRAM,
+            t.ts
+        FROM
+            time_tbl t
+        JOIN
+            name_tbl n ON t.sr_code = n.sr_code
+        WHERE
+            t.ts >= ? AND t.ts < ?
+        ORDER BY
+            t.ts DESC;
+    """, (start, end))
+    return cursor.fetchall()
+
+
+def fetch_monthly_attendance(cursor, year, month):
+    """Return (ts, sr_code, full_name, College, PROGRAM) rows for one month, newest first"""
+    start, end = month_bounds(year, month)
+    cursor.execute("""
+        SELECT
+            t.ts,
+            t.sr_code,
+            n.full_name,
+            n.College,
+            n.PROGRAM
+        FROM
+            time_tbl t
+        JOIN
+            name_tbl n ON t.sr_code = n.sr_code
+        WHERE
+            t.ts >= ? AND t.ts < ?
+        ORDER BY
+            t.ts DESC;
+    """, (start, end))
+    return cursor.fetchall()
+
+
+def fetch_attendance_page(cursor, start, end, after=None, limit=HISTORY_PAGE_SIZE):
+    """Fetch one page of time-ins in [start, end), newest first.
+
+    `after` is the key returned with the previous page (None for the first
+    page). Returns (rows, next_key) where rows are
+    (ts, sr_code, full_name, College, PROGRAM, CAMPUS) and next_key is None
+    once the last page has been reached.
+    """
+    # (end, 0) sorts after every row in range, so the first page needs no special case
+    last_ts, last_id = after if after is not None else (end, 0)
+    cursor.execute("""
+        SELECT
+            t.ts,
+            t.sr_code,
+            n.full_name,
+            n.College,
+            n.PROGRAM,
+            n.CAMPUS,
+            t.id
+        FROM
+            time_tbl t
+        JOIN
+            name_tbl n ON t.sr_code = n.sr_code
+        WHERE
+            t.ts >= ? AND (t.ts, t.id) < (?, ?)
+        ORDER BY
+            t.ts DESC, t.id DESC
+        LIMIT ?;
+    """, (start, last_ts, last_id, limit + 1))
+
+    records = cursor.fetchall()
+    next_key = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_key = (records[-1][0], records[-1][6])
+    return [record[:6] for record in records], next_key
+
+
+def semester_months(day):
+    """Return the first and last month ('YYYY-MM') of the semester containing day"""
+    if day.month >= 8:
+        # First semester: August to December
+        return f"{day.year}-08", f"{day.year}-12"
+    if day.month <= 5:
+        # Second semester: January to May
+        return f"{day.year}-01", f"{day.year}-05"
+    # Mid-year term: June and July
+    return f"{day.year}-06", f"{day.year}-07"
+
+
+def fetch_student(cursor, sr_code):
+    """Return (full_name, College, PROGRAM, CAMPUS) for a student, or None"""
+    cursor.execute(
+        "SELECT full_name, College, PROGRAM, CAMPUS FROM name_tbl WHERE sr_code = ?",
+        (sr_code,)
+    )
+    return cursor.fetchone()
+
+
+def fetch_student_history(cursor, sr_code, after=None, limit=HISTORY_PAGE_SIZE):
+    """Fetch one page of a student's time-ins, newest first.
+
+    `after` is the key returned with the previous page (None for the first
+    page). Returns (rows, next_key) where rows are (date, time_in_12hr) and
+    next_key is None once the last page has been reached.
+    """
+    if after is None:
+        cursor.execute("""
+            SELECT id, ts
+            FROM time_tbl
+            WHERE sr_code = ?
+            ORDER BY ts DESC, id DESC
+            LIMIT ?
+        """, (sr_code, limit + 1))
+    else:
+        last_ts, last_id = after
+        cursor.execute("""
+            SELECT id, ts
+            FROM time_tbl
+            WHERE sr_code = ?
+              AND (ts, id) < (?, ?)
+            ORDER BY ts DESC, id DESC
+            LIMIT ?
+        """, (sr_code, last_ts, last_id, limit + 1))
+
+    records = cursor.fetchall()
+    next_key = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_key = (records[-1][1], records[-1][0])
+
+    # Only the rows on this page are ever formatted
+    rows = [(format_date(ts), format_time(ts)) for _, ts in records]
+    return rows, next_key
+
+
+def student_visit_totals(cursor, sr_code, today=None):
+    """Return visit counts for this month, this semester and all time"""
+    today = today or ph_now().date()
+    month = today.strftime("%Y-%m")
+    sem_start, sem_end = semester_months(today)
+
+    cursor.execute("""
+        SELECT
+            COALESCE(SUM(CASE WHEN month = ? THEN visits END), 0),
+            COALESCE(SUM(CASE WHEN month BETWEEN ? AND ? THEN visits END), 0),
+            COALESCE(SUM(visits), 0)
+        FROM visit_count_tbl
+        WHERE sr_code = ?
+    """, (month, sem_start, sem_end, sr_code))
+    this_month, this_semester, all_time = cursor.fetchone()
+    return {
+        "month": this_month,
+        "semester": this_semester,
+        "total": all_time,
+    }
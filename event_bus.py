@@ -0,0 +1,159 @@
+import json
+import queue
+import socket
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EVENT_FEED_HOST = "127.0.0.1"
+EVENT_FEED_PORT = 8765
+# Web origin allowed to read the feed from a browser (e.g. "http://display.local");
+# None sends no CORS header, so other pages on the kiosk cannot read student data
+EVENT_FEED_ORIGIN = None
+
+# Events a subscriber may fall behind before it is disconnected
+SUBSCRIBER_BUFFER = 256
+# Recent events kept so reconnecting clients can catch up via Last-Event-ID
+EVENT_HISTORY = 1024
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+
+class Subscription:
+    """A subscriber's bounded event buffer.
+
+    The publisher never waits on a subscriber. If the buffer is full the
+    subscription is marked as overflowed and further events are dropped;
+    the stream handler then closes the connection so the client reconnects
+    and resumes from the bus history.
+    """
+    def __init__(self, maxsize=SUBSCRIBER_BUFFER):
+        self.events = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process publish/subscribe for committed time-ins.
+
+    Events are dicts carrying the time_tbl id, which doubles as the event id.
+    """
+    def __init__(self, history=EVENT_HISTORY):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.recent = deque(maxlen=history)
+
+    def publish(self, event):
+        with self.lock:
+            self.recent.append(event)
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def subscribe(self, last_event_id=None, maxsize=SUBSCRIBER_BUFFER):
+        """Register a subscriber, first replaying events after last_event_id"""
+        subscription = Subscription(maxsize)
+        with self.lock:
+            if last_event_id is not None:
+                for event in self.recent:
+                    if event["id"] > last_event_id:
+                        subscription.offer(event)
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+
+class EventStreamHandler(BaseHTTPRequestHandler):
+    """Serves the bus as server-sent events on /events"""
+    def do_GET(self):
+        if self.path.split("?")[0] != "/events":
+            self.send_error(404)
+            return
+
+        last_event_id = self.headers.get("Last-Event-ID")
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        if self.server.allow_origin:
+            self.send_header("Access-Control-Allow-Origin", self.server.allow_origin)
+            self.send_header("Vary", "Origin")
+        self.end_headers()
+
+        bus = self.server.bus
+        subscription = bus.subscribe(last_event_id)
+        try:
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while not self.server.stopping.is_set():
+                if subscription.overflowed and subscription.events.empty():
+                    # Too slow to keep up; the client reconnects and catches
+                    # up from the bus history using Last-Event-ID
+                    break
+                event = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if event is None:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    self.wfile.write(
+                        f"id: {event['id']}\nevent: time_in\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+                    )
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            bus.unsubscribe(subscription)
+
+    def log_message(self, format, *args):
+        # Keep the kiosk console quiet
+        pass
+
+
+class EventStreamServer(ThreadingHTTPServer):
+    """Local HTTP server streaming bus events to displays and other systems"""
+    daemon_threads = True
+    # On Windows SO_REUSEADDR lets a second kiosk bind a port already in use
+    allow_reuse_address = sys.platform != "win32"
+
+    def __init__(self, bus, host=EVENT_FEED_HOST, port=EVENT_FEED_PORT, allow_origin=EVENT_FEED_ORIGIN):
+        self.bus = bus
+        self.allow_origin = allow_origin
+        super().__init__((host, port), EventStreamHandler)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def server_bind(self):
+        if sys.platform == "win32":
+            # Fail with "address in use" instead of sharing the port
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        super().server_bind()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import heapq
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from db import (
+    day_bounds, fetch_attendance_page, format_date, format_time,
+    has_legacy_time_tbl, month_bounds
+)
+
+FEDERATED_HEADERS = ["Date", "Time-In", "Campus", "SR Code", "Full Name", "College", "Program"]
+# Rows fetched from one campus per round trip to a worker process
+FEDERATED_CHUNK = 5000
+
+
+def report_bounds(view, first_day, last_day=None):
+    """Epoch range for a 'daily', 'monthly' or 'range' report"""
+    if view == "daily":
+        return day_bounds(first_day)
+    if view == "monthly":
+        return month_bounds(first_day.year, first_day.month)
+    if view == "range":
+        start, _ = day_bounds(first_day)
+        _, end = day_bounds(last_day or first_day)
+        return start, end
+    raise ValueError(f"Unknown report view: {view}")
+
+
+def campus_name(db_path):
+    """Fallback campus label for students without a CAMPUS value"""
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def query_campus(db_path, start, end, after=None, limit=FEDERATED_CHUNK):
+    """Fetch one chunk of the report from one campus database (in a worker process).
+
+    Returns (rows, next_key) as fetch_attendance_page does, with rows as
+    (ts, campus, sr_code, full_name, College, PROGRAM), newest first.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        if has_legacy_time_tbl(cursor):
+            raise ValueError(f"{db_path} uses the old schema; run migrate_db.py on it first")
+        fallback = campus_name(db_path)
+        rows, next_key = fetch_attendance_page(cursor, start, end, after, limit)
+        return [
+            (ts, campus or fallback, sr_code, full_name, college, program)
+            for ts, sr_code, full_name, college, program, campus in rows
+        ], next_key
+    finally:
+        conn.close()
+
+
+def campus_rows(pool, db_path, start, end, first_chunk):
+    """Yield one campus's rows, requesting each next chunk before using the current one"""
+    future = first_chunk
+    while future is not None:
+        rows, next_key = future.result()
+        future = pool.submit(query_campus, db_path, start, end, next_key) if next_key else None
+        yield from rows
+
+
+def federated_report(db_paths, start, end, max_workers=None):
+    """Query every campus database in parallel and stream the merged rows.
+
+    Each campus is read newest first in chunks of FEDERATED_CHUNK rows, and
+    the streams are combined with a lazy k-way merge on the timestamp, so
+    only about two chunks per campus are held in memory at a time. The
+    first chunk of every campus is requested up front so they are queried
+    in parallel.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        first_chunks = [pool.submit(query_campus, path, start, end) for path in db_paths]
+        streams = [
+            campus_rows(pool, path, start, end, first_chunk)
+            for path, first_chunk in zip(db_paths, first_chunks)
+        ]
+        yield from heapq.merge(*streams, key=lambda row: row[0], reverse=True)
+
+
+def format_row(row):
+    """Format a merged row for display or CSV, in FEDERATED_HEADERS order"""
+    ts, campus, sr_code, full_name, college, program = row
+    return [format_date(ts), format_time(ts), campus, sr_code, full_name, college, program]
+
+
+def parse_day(value):
+    return date.fromisoformat(value)
+
+
+def parse_month(value):
+    return date.fromisoformat(f"{value}-01")
+
+
+if __name__ == "__main__":
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("-o", "--output", help="CSV file to write (default: standard output)")
+    options.add_argument("--workers", type=int, help="number of worker processes")
+
+    parser = argparse.ArgumentParser(description="Attendance report across several campus databases")
+    views = parser.add_subparsers(dest="view", required=True)
+
+    daily = views.add_parser("daily", parents=[options], help="one day (YYYY-MM-DD)")
+    daily.add_argument("day", type=parse_day)
+    daily.add_argument("db_paths", nargs="+")
+
+    monthly = views.add_parser("monthly", parents=[options], help="one month (YYYY-MM)")
+    monthly.add_argument("month", type=parse_month)
+    monthly.add_argument("db_paths", nargs="+")
+
+    date_range = views.add_parser("range", parents=[options], help="inclusive date range (YYYY-MM-DD YYYY-MM-DD)")
+    date_range.add_argument("first_day", type=parse_day)
+    date_range.add_argument("last_day", type=parse_day)
+    date_range.add_argument("db_paths", nargs="+")
+
+    args = parser.parse_args()
+    if args.view == "range" and args.first_day > args.last_day:
+        parser.error("the first day must not be after the last day")
+    if args.view == "daily":
+        start, end = report_bounds("daily", args.day)
+    elif args.view == "monthly":
+        start, end = report_bounds("monthly", args.month)
+    else:
+        start, end = report_bounds("range", args.first_day, args.last_day)
+
+    rows = federated_report(args.db_paths, start, end, args.workers)
+    try:
+        # The merge reads every campus's first chunk before yielding a row,
+        # so schema and connection problems show up before the output exists
+        first_row = next(rows, None)
+    except (ValueError, sqlite3.Error) as e:
+        parser.error(str(e))
+
+    output = open(args.output, mode='w', newline='', encoding='utf-8') if args.output else sys.stdout
+    failure = None
+    try:
+        writer = csv.writer(output)
+        writer.writerow(FEDERATED_HEADERS)
+        if first_row is not None:
+            writer.writerow(format_row(first_row))
+        for row in rows:
+            writer.writerow(format_row(row))
+    except (ValueError, sqlite3.Error) as e:
+        failure = e
+    finally:
+        if args.output:
+            output.close()
+
+    if failure is not None:
+        # Never leave a partial report behind
+        if args.output:
+            os.remove(args.output)
+        parser.error(str(failure))
@@ -1,5 +1,10 @@
 import sqlite3
 
+from backup import backup_database
+
+# Keep a copy of everything about to be deleted
+print(f"Backup written to {backup_database('attendance.db')}")
+
 # Connect to your SQLite database
 conn = sqlite3.connect('attendance.db')
 cursor = conn.cursor()
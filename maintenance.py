@@ -0,0 +1,264 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from backup import backup_database, default_backup_dir, latest_backup_age
+from db import PH_OFFSET, fetch_daily_attendance, format_time, month_bounds, ph_now
+
+# Minutes without a scan before maintenance may start
+IDLE_MINUTES = 5
+# Longest a single idle run may take before it stops until the next idle period
+RUN_BUDGET = 60
+# Rows written per step while pre-generating an export
+EXPORT_CHUNK = 500
+# Pre-generated daily exports kept; older ones are deleted
+EXPORT_KEEP = 31
+# Take a scheduled backup when the newest one is older than this
+BACKUP_INTERVAL_HOURS = 24
+# Share of free pages (e.g. after the time_tbl migration) that triggers a VACUUM
+VACUUM_FREE_RATIO = 0.1
+
+DAILY_EXPORT_HEADERS = ["SR Code", "Full Name", "College", "Program", "Time-In"]
+
+
+class MaintenanceInterrupted(Exception):
+    """Stops a maintenance run when a scan arrives or the budget runs out"""
+
+
+def exports_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "exports")
+
+
+def daily_export_path(db_path, day):
+    """Where the pre-generated CSV for one day is kept"""
+    return os.path.join(exports_dir(db_path), f"Attendance_{day:%Y-%m-%d}.csv")
+
+
+def list_exports(db_path):
+    """Pre-generated daily CSVs, newest first"""
+    directory = exports_dir(db_path)
+    if not os.path.isdir(directory):
+        return []
+    names = [
+        name for name in os.listdir(directory)
+        if name.startswith("Attendance_") and name.endswith(".csv")
+    ]
+    # Dated names sort chronologically
+    return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+
+def clear_exports(db_path):
+    """Delete pre-generated CSVs, e.g. after an import or restore changed the data"""
+    for path in list_exports(db_path):
+        os.remove(path)
+
+
+def refresh_statistics(conn, db_path):
+    """Let SQLite re-analyze tables whose statistics are stale"""
+    # Bound the work ANALYZE does per index
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("PRAGMA optimize")
+    yield
+
+
+def scheduled_backup(conn, db_path):
+    """Back up the database if the newest backup is too old"""
+    age = latest_backup_age(default_backup_dir(db_path))
+    if age is not None and age < BACKUP_INTERVAL_HOURS * 3600:
+        return
+    yield
+    # One backup step; under WAL it never blocks a scan
+    backup_database(db_path)
+    yield
+
+
+def checkpoint_wal(conn, db_path):
+    """Copy committed WAL pages back into the database file"""
+    # PASSIVE never waits on the kiosk's connection
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    yield
+
+
+def reclaim_free_pages(conn, db_path):
+    """Rebuild the file once a large part of it is unused pages"""
+    page_count = conn.execute("PRAGMA page_count").fetchall()[0][0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchall()[0][0]
+    yield
+    if page_count and free_pages / page_count >= VACUUM_FREE_RATIO:
+        # A scan interrupts the VACUUM, which then rolls back and is retried
+        # in the next idle period
+        conn.execute("VACUUM")
+        yield
+
+
+def backfill_visit_counts(conn, db_path):
+    """Rebuild visit_count_tbl for any month whose totals disagree with time_tbl"""
+    first_ts, last_ts = conn.execute("SELECT MIN(ts), MAX(ts) FROM time_tbl").fetchall()[0]
+    if first_ts is None:
+        return
+    epoch = date(1970, 1, 1)
+    month = (epoch + timedelta(days=(first_ts + PH_OFFSET) // 86400)).replace(day=1)
+    last_month = (epoch + timedelta(days=(last_ts + PH_OFFSET) // 86400)).replace(day=1)
+
+    while month <= last_month:
+        start, end = month_bounds(month.year, month.month)
+        key = f"{month:%Y-%m}"
+        logged = conn.execute(
+            "SELECT COUNT(*) FROM time_tbl WHERE ts >= ? AND ts < ?", (start, end)
+        ).fetchall()[0][0]
+        rolled_up = conn.execute(
+            "SELECT COALESCE(SUM(visits), 0) FROM visit_count_tbl WHERE month = ?", (key,)
+        ).fetchall()[0][0]
+
+        if logged != rolled_up:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM visit_count_tbl WHERE month = ?", (key,))
+                conn.execute("""
+                    INSERT INTO visit_count_tbl (sr_code, month, visits)
+                    SELECT sr_code, ?, COUNT(*)
+                    FROM time_tbl
+                    WHERE ts >= ? AND ts < ?
+                    GROUP BY sr_code
+                """, (key, start, end))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        yield
+
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def export_previous_day(conn, db_path):
+    """Pre-generate yesterday's daily CSV so exporting it is a file copy"""
+    yesterday = ph_now().date() - timedelta(days=1)
+    path = daily_export_path(db_path, yesterday)
+    if os.path.exists(path):
+        return
+
+    rows = fetch_daily_attendance(conn.cursor(), yesterday)
+    yield
+
+    os.makedirs(exports_dir(db_path), exist_ok=True)
+    partial_path = path + ".partial"
+    try:
+        with open(partial_path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(DAILY_EXPORT_HEADERS)
+            for offset in range(0, len(rows), EXPORT_CHUNK):
+                writer.writerows(
+                    [sr_code, full_name, college, program, format_time(ts)]
+                    for sr_code, full_name, college, program, ts
+                    in rows[offset:offset + EXPORT_CHUNK]
+                )
+                yield
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    for old_path in list_exports(db_path)[EXPORT_KEEP:]:
+        os.remove(old_path)
+
+
+# (job, minimum seconds between completed runs)
+DEFAULT_JOBS = [
+    (scheduled_backup, 60 * 60),
+    (checkpoint_wal, 15 * 60),
+    (export_previous_day, 60 * 60),
+    (backfill_visit_counts, 24 * 60 * 60),
+    (refresh_statistics, 24 * 60 * 60),
+    (reclaim_free_pages, 24 * 60 * 60),
+]
+
+
+class MaintenanceScheduler:
+    """Runs database upkeep in the background while the kiosk is idle.
+
+    poll() is called from the kiosk's clock timer and starts a worker thread
+    once no scan has arrived for idle_minutes. Jobs are generators that do a
+    bounded piece of work per step; between steps the worker checks whether
+    a scan arrived or the run budget is spent. notify_scan() also interrupts
+    the SQLite statement in progress, so a scan never waits on maintenance.
+    Interrupted jobs simply run again in the next idle period; failed jobs
+    wait for their normal interval.
+    """
+    def __init__(self, db_path, jobs=None, idle_minutes=IDLE_MINUTES, run_budget=RUN_BUDGET):
+        self.db_path = db_path
+        self.jobs = jobs if jobs is not None else DEFAULT_JOBS
+        self.idle_seconds = idle_minutes * 60
+        self.run_budget = run_budget
+        self.last_scan = time.monotonic()
+        self.last_completed = {}
+        self.scan_arrived = threading.Event()
+        self.thread = None
+        # Guards handing self.conn between the worker and notify_scan()
+        self.conn_lock = threading.Lock()
+        self.conn = None
+
+    def notify_scan(self):
+        """Record a scan and make any running job yield immediately"""
+        self.last_scan = time.monotonic()
+        self.scan_arrived.set()
+        with self.conn_lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def due_jobs(self, now):
+        return [
+            (job, interval) for job, interval in self.jobs
+            if now - self.last_completed.get(job.__name__, float("-inf")) >= interval
+        ]
+
+    def poll(self):
+        """Start a maintenance run if the kiosk has been idle long enough"""
+        if self.is_running():
+            return
+        now = time.monotonic()
+        if now - self.last_scan < self.idle_seconds or not self.due_jobs(now):
+            return
+        self.scan_arrived.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.notify_scan()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        deadline = time.monotonic() + self.run_budget
+        conn = sqlite3.connect(self.db_path, timeout=1)
+        with self.conn_lock:
+            self.conn = conn
+        try:
+            for job, _ in self.due_jobs(time.monotonic()):
+                try:
+                    for _ in job(conn, self.db_path):
+                        if self.scan_arrived.is_set() or time.monotonic() > deadline:
+                            raise MaintenanceInterrupted()
+                except MaintenanceInterrupted:
+                    break
+                except sqlite3.OperationalError as e:
+                    if self.scan_arrived.is_set():
+                        # Statement cut short by notify_scan()
+                        break
+                    print(f"Warning: Maintenance job {job.__name__} failed: {e}")
+                except Exception as e:
+                    print(f"Warning: Maintenance job {job.__name__} failed: {e}")
+                # A failed job also waits out its interval instead of retrying every poll
+                self.last_completed[job.__name__] = time.monotonic()
+        finally:
+            # Never close the connection while notify_scan() may be interrupting it
+            with self.conn_lock:
+                self.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            conn.close()
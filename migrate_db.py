@@ -0,0 +1,43 @@
+import argparse
+import sqlite3
+
+from db import MIGRATION_BATCH_SIZE, ensure_schema, has_legacy_time_tbl, migrate_time_tbl
+
+# Converts an attendance database to the integer-epoch time_tbl layout.
+# Stop any kiosk still running an older version first: it writes time_in and
+# date_in, and every scan fails once the tables are swapped. The kiosk of this
+# version converts its own database on startup; running this script ahead of
+# time avoids that wait on large databases. Rows are copied in small batches,
+# so readers such as backups and reports are never blocked for long.
+
+parser = argparse.ArgumentParser(description="Migrate attendance.db to the compact timestamp schema")
+parser.add_argument("db_path", nargs="?", default="attendance.db")
+parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE,
+                    help="rows copied per transaction")
+parser.add_argument("--pause", type=float, default=0.05,
+                    help="seconds to sleep between batches")
+parser.add_argument("--no-vacuum", dest="vacuum", action="store_false",
+                    help="skip rebuilding the file afterwards to return the space freed by the old table")
+args = parser.parse_args()
+
+conn = sqlite3.connect(args.db_path, timeout=30)
+cursor = conn.cursor()
+
+
+def report(done, total):
+    print(f"Copied {done}/{total} rows", flush=True)
+
+
+if has_legacy_time_tbl(cursor):
+    migrate_time_tbl(conn, batch_size=args.batch_size, pause=args.pause, progress=report)
+    print("time_tbl migrated")
+else:
+    print("time_tbl already uses the compact schema")
+
+ensure_schema(conn)
+
+if args.vacuum:
+    print("Vacuuming...")
+    conn.execute("VACUUM")
+
+conn.close()
@@ -0,0 +1,65 @@
+import sys
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+# Rows sampled when estimating the memory used by a result
+SIZE_SAMPLE_ROWS = 100
+
+
+def estimate_size(rows):
+    """Rough memory footprint of a list of row tuples, in bytes"""
+    size = sys.getsizeof(rows)
+    if not rows:
+        return size
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    sample_size = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+    return size + sample_size * len(rows) // len(sample)
+
+
+class ResultCache:
+    """LRU cache of query results bounded by an approximate memory budget.
+
+    Each entry carries a version. Results for closed periods (past days and
+    months) are stored with version None and never go stale. Results that
+    can still change are stored with the highest time_tbl.id at query time
+    and are only returned while the caller passes the same version.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key, version=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        rows, size, entry_version = entry
+        if entry_version != version:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return rows
+
+    def put(self, key, rows, version=None):
+        if key in self.entries:
+            self._remove(key)
+        size = estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (rows, size, version)
+        self.used_bytes += size
+        while self.used_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.used_bytes -= size
@@ -0,0 +1,281 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+# Stall monitor tick; gaps longer than this plus STALL_THRESHOLD count as stalls
+MONITOR_INTERVAL = 10  # ms
+STALL_THRESHOLD = 50  # ms
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class KioskSimulator:
+    """Drives AttendanceApp like a morning queue of students.
+
+    Scans arrive as a Poisson process. Like a barcode scanner, each one types
+    an SR code and presses Enter into whichever widget has keyboard focus,
+    while an AdminWindow on the same connection auto-refreshes. Latency is
+    measured from the scheduled arrival to the kiosk's acknowledgement, so
+    time spent queued behind a busy event loop is included. Keystrokes that
+    land anywhere but sr_input are counted as mis-routed.
+    """
+    def __init__(self, app_module, window, admin, args):
+        self.app_module = app_module
+        self.window = window
+        self.admin = admin
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.sr_codes = [f"SIM-{i:06d}" for i in range(args.students)]
+
+        self.arrivals = []
+        self.latencies = []
+        self.expected = Counter()
+        self.misrouted = []
+        self.destinations = Counter()
+        self.popups = []
+        self.stalls = []
+        self.refresh_durations = []
+        self.started = None
+        self.last_tick = None
+
+    def seed_database(self):
+        conn = self.window.conn
+        conn.executemany(
+            "INSERT OR REPLACE INTO name_tbl (sr_code, full_name, College, PROGRAM, CAMPUS) VALUES (?, ?, ?, ?, ?)",
+            [(code, f"Student {code}", "CICS", "BSIT", "Simulated") for code in self.sr_codes]
+        )
+        # Earlier time-ins today, so the admin view has realistic work to do
+        now = self.app_module.now_ts()
+        conn.executemany(
+            "INSERT INTO time_tbl (sr_code, ts) VALUES (?, ?)",
+            [
+                (self.rng.choice(self.sr_codes), now - self.rng.randrange(1, 4 * 3600))
+                for _ in range(self.args.backlog)
+            ]
+        )
+        conn.commit()
+        self.baseline_counts = Counter(
+            dict(conn.execute("SELECT sr_code, COUNT(*) FROM time_tbl GROUP BY sr_code").fetchall())
+        )
+
+    def patch_dialogs(self):
+        """Record message boxes instead of blocking the event loop on them"""
+        def record(kind):
+            def show(parent, title, text, *args, **kwargs):
+                self.popups.append((kind, title, text))
+            return staticmethod(show)
+        for kind in ("warning", "critical", "information"):
+            setattr(self.app_module.QMessageBox, kind, record(kind))
+
+    def instrument_admin(self):
+        refresh = self.admin.refresh_data
+
+        def timed_refresh():
+            start = time.perf_counter()
+            refresh()
+            self.refresh_durations.append((time.perf_counter() - start) * 1000)
+
+        self.admin.refresh_timer.timeout.disconnect()
+        self.admin.refresh_timer.timeout.connect(timed_refresh)
+        self.admin.auto_refresh_interval = self.args.admin_refresh
+        self.admin.auto_refresh_check.setChecked(True)
+
+    def plan_arrivals(self):
+        t = 0.0
+        while True:
+            t += self.rng.expovariate(self.args.rate)
+            if t > self.args.duration:
+                break
+            self.arrivals.append((t, self.rng.choice(self.sr_codes)))
+
+    def start(self):
+        self.seed_database()
+        self.patch_dialogs()
+        self.instrument_admin()
+        self.plan_arrivals()
+
+        self.started = time.perf_counter()
+        self.last_tick = self.started
+        self.monitor = QTimer()
+        self.monitor.timeout.connect(self.check_stall)
+        self.monitor.start(MONITOR_INTERVAL)
+
+        if self.args.admin_focus:
+            self.focus_timer = QTimer()
+            self.focus_timer.timeout.connect(self.admin.activateWindow)
+            self.focus_timer.start(self.args.admin_focus * 1000)
+
+        self.next_arrival = 0
+        self.schedule_next()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def check_stall(self):
+        now = time.perf_counter()
+        gap = (now - self.last_tick) * 1000 - MONITOR_INTERVAL
+        if gap > STALL_THRESHOLD:
+            self.stalls.append(gap)
+        self.last_tick = now
+
+    def describe(self, widget):
+        """Name the widget keystrokes landed in, e.g. 'kiosk.sr_input'"""
+        if widget is None:
+            return "nowhere (no widget has focus)"
+        for owner, label in ((self.window, "kiosk"), (self.admin, "admin")):
+            for attr, value in vars(owner).items():
+                if value is widget:
+                    return f"{label}.{attr}"
+        return f"{type(widget).__name__} in {widget.window().windowTitle()!r}"
+
+    def schedule_next(self):
+        if self.next_arrival >= len(self.arrivals):
+            # Let the admin refresh and the event loop settle, then stop
+            QTimer.singleShot(self.args.drain * 1000, self.finish)
+            return
+        due, _ = self.arrivals[self.next_arrival]
+        delay = max(0, int((due - self.elapsed()) * 1000))
+        QTimer.singleShot(delay, self.scan)
+
+    def scan(self):
+        due, sr_code = self.arrivals[self.next_arrival]
+        self.next_arrival += 1
+        self.expected[sr_code] += 1
+
+        sr_input = self.window.sr_input
+        if sr_input.text():
+            self.misrouted.append((sr_code, f"input not empty: {sr_input.text()!r}"))
+            sr_input.clear()
+
+        # A scanner types into whatever has focus, not necessarily sr_input
+        target = QApplication.focusWidget()
+        destination = self.describe(target)
+        self.destinations[destination] += 1
+        if target is not sr_input:
+            self.misrouted.append((sr_code, f"keystrokes went to {destination}"))
+            if target is not None:
+                QTest.keyClicks(target, sr_code, Qt.NoModifier, self.args.key_delay)
+                QTest.keyClick(target, Qt.Key_Return)
+            self.schedule_next()
+            return
+
+        QTest.keyClicks(sr_input, sr_code, Qt.NoModifier, self.args.key_delay)
+        QTest.keyClick(sr_input, Qt.Key_Return)
+
+        status = self.window.status_label.text()
+        if sr_code in status and not sr_input.text():
+            self.latencies.append((self.elapsed() - due) * 1000)
+        else:
+            self.misrouted.append((sr_code, f"status {status!r}, input {sr_input.text()!r}"))
+
+        self.schedule_next()
+
+    def finish(self):
+        self.monitor.stop()
+        if self.args.admin_focus:
+            self.focus_timer.stop()
+        self.admin.refresh_timer.stop()
+        QApplication.instance().quit()
+
+    def report(self):
+        conn = self.window.conn
+        recorded = Counter(
+            dict(conn.execute("SELECT sr_code, COUNT(*) FROM time_tbl GROUP BY sr_code").fetchall())
+        )
+        recorded.subtract(self.baseline_counts)
+        dropped = sum((self.expected - recorded).values())
+        unexpected = sum((recorded - self.expected).values())
+
+        lines = [
+            f"Scans attempted:     {len(self.arrivals)} over {self.args.duration}s "
+            f"({self.args.rate}/s, {self.args.students} students, {self.args.backlog} earlier rows)",
+            f"Acknowledged:        {len(self.latencies)}",
+            "Scan-to-ack latency: "
+            f"p50 {percentile(self.latencies, 50):.1f} ms, "
+            f"p90 {percentile(self.latencies, 90):.1f} ms, "
+            f"p99 {percentile(self.latencies, 99):.1f} ms, "
+            f"max {max(self.latencies, default=0):.1f} ms",
+            f"Dropped scans:       {dropped}",
+            f"Unexpected rows:     {unexpected}",
+            f"Mis-routed input:    {len(self.misrouted)}",
+            "Keystrokes landed:   " + ", ".join(
+                f"{destination} {count}" for destination, count in self.destinations.most_common()
+            ),
+            f"Dialogs shown:       {len(self.popups)}",
+            f"Event-loop stalls:   {len(self.stalls)} over {STALL_THRESHOLD} ms, "
+            f"max {max(self.stalls, default=0):.1f} ms, total {sum(self.stalls):.0f} ms",
+            f"Admin refreshes:     {len(self.refresh_durations)}, "
+            f"p50 {percentile(self.refresh_durations, 50):.1f} ms, "
+            f"max {max(self.refresh_durations, default=0):.1f} ms",
+        ]
+        for sr_code, problem in self.misrouted[:10]:
+            lines.append(f"  mis-routed {sr_code}: {problem}")
+        for kind, title, text in self.popups[:10]:
+            lines.append(f"  {kind} dialog {title!r}: {text}")
+        return "\n".join(lines), dropped + unexpected + len(self.misrouted) + len(self.popups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a kiosk rush headlessly and report UI latency")
+    parser.add_argument("--rate", type=float, default=2.0, help="average scans per second")
+    parser.add_argument("--duration", type=int, default=60, help="seconds of arrivals to simulate")
+    parser.add_argument("--students", type=int, default=5000, help="students in the roster")
+    parser.add_argument("--backlog", type=int, default=20000, help="time-ins already recorded today")
+    parser.add_argument("--admin-refresh", type=int, default=10000, help="admin auto-refresh interval (ms)")
+    parser.add_argument("--key-delay", type=int, default=0, help="delay between keystrokes (ms); 0 for a barcode scanner")
+    parser.add_argument("--admin-focus", type=int, default=0,
+                        help="bring the admin window to the front every N seconds (0: never)")
+    parser.add_argument("--drain", type=int, default=2, help="seconds to keep running after the last arrival")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p99", type=float, help="exit with an error if p99 latency exceeds this (ms)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="attendance_sim_")
+    os.environ["ATTENDANCE_DB_PATH"] = os.path.join(workdir, "attendance.db")
+
+    qt_app = QApplication(sys.argv)
+    import app as app_module
+
+    window = app_module.AttendanceApp()
+    window.show()
+    admin = app_module.AdminWindow(window.conn)
+    admin.show()
+    # The kiosk is in front when the rush starts; see --admin-focus
+    window.activateWindow()
+    window.sr_input.setFocus()
+
+    simulator = KioskSimulator(app_module, window, admin, args)
+    QTimer.singleShot(0, simulator.start)
+    qt_app.exec_()
+
+    summary, problems = simulator.report()
+    admin.close()
+    window.close()
+
+    print(summary)
+    print(f"Scratch database: {os.environ['ATTENDANCE_DB_PATH']}")
+
+    p99 = percentile(simulator.latencies, 99)
+    if problems or (args.max_p99 is not None and p99 > args.max_p99):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()